@@ -0,0 +1,272 @@
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import re
+import shutil
+from build import hash_file, remove_output, save_manifest
+from fingerprint import FINGERPRINT_EXTENSIONS, fingerprint_path, rewrite_css_urls
+from traverse import scan_files
+
+STATIC_MANIFEST_VERSION = 1
+CSS_TOKEN_PATTERN = re.compile(
+    r"""("(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')"""  # strings
+    r"|(/\*.*?(?:\*/|\Z))"  # comments, an unclosed one runs to the end
+    r"|(\s+)"
+    r"|([^\s\"'/{};,>]+|.)",
+    re.DOTALL,
+)
+# No whitespace is needed on either side of these
+CSS_TIGHT_CHARS = "{};,>"
+
+
+def load_static_manifest(manifest_path: str) -> dict:
+    """Return the previous sync's manifest, or an empty one if unusable."""
+    try:
+        with open(manifest_path, "r") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return {"files": []}
+    if manifest.get("version") != STATIC_MANIFEST_VERSION:
+        return {"files": []}
+    return manifest
+
+
+def minify_css(css: str) -> str:
+    """Drop comments and needless whitespace from a stylesheet.
+
+    Strings are kept as written. Whitespace is only removed next to braces,
+    semicolons, commas, child combinators and the colons of declarations,
+    so selectors such as 'a :hover' and values such as 'calc(1px + 2%)'
+    keep their meaning.
+    """
+    tokens, spaced, space = [], [], False
+    for match in CSS_TOKEN_PATTERN.finditer(css):
+        string, _, _, text = match.groups()
+        if string is None and text is None:
+            space = True
+            continue
+        tokens.append(string or text)
+        spaced.append(space)
+        space = False
+    # A colon belongs to a declaration unless a '{' follows before ';' or '}'
+    ends, end = [None] * len(tokens), None
+    for index in range(len(tokens) - 1, -1, -1):
+        ends[index] = end
+        if tokens[index] in ("{", ";", "}"):
+            end = tokens[index]
+    output = []
+    for index, text in enumerate(tokens):
+        if spaced[index] and output:
+            edges = output[-1][-1] + text[0]
+            if not any(char in CSS_TIGHT_CHARS for char in edges) and not (
+                ":" in edges and ends[index] != "{"
+            ):
+                output.append(" ")
+        if text == "}" and output and output[-1] == ";":
+            output.pop()
+        output.append(text)
+    return "".join(output)
+
+
+def stylesheet_output(source_path, rel_path, minify, assets) -> tuple:
+    """Return a stylesheet's bytes as published, and the bytes minify saved.
+
+    With assets, url() references to fingerprinted assets are rewritten.
+    """
+    with open(source_path, "r", encoding="utf-8") as file:
+        css = file.read()
+    if assets:
+        css = rewrite_css_urls(css, assets, posixpath.dirname(rel_path))
+    if not minify:
+        return css.encode("utf-8"), 0
+    data = minify_css(css).encode("utf-8")
+    return data, len(css.encode("utf-8")) - len(data)
+
+
+def load_assets(asset_manifest_path: str) -> dict:
+    """Return the asset manifest's map of fingerprinted names, if any."""
+    try:
+        with open(asset_manifest_path, "r") as file:
+            assets = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    return assets if isinstance(assets, dict) else {}
+
+
+def is_unchanged(source_path, source_stat, dest_path, checksum=False) -> bool:
+    """Compare a static file with its copy by size and mtime, or content hash."""
+    try:
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:
+        return False
+    if dest_stat.st_size != source_stat.st_size:
+        return False
+    elif checksum:
+        return hash_file(source_path) == hash_file(dest_path)
+    else:
+        return dest_stat.st_mtime_ns == source_stat.st_mtime_ns
+
+
+def sync_static(
+    source: str,
+    destination: str,
+    manifest_path: str,
+    logger: logging.Logger,
+    checksum: bool = False,
+    minify: bool = False,
+    asset_manifest_path: str | None = None,
+) -> dict:
+    """Mirror source into destination, copying only new or changed files.
+
+    Copies keep the source mtime so the next sync can skip them by size and
+    mtime alone; with checksum=True matching sizes are settled by content
+    hash instead. Files a previous sync copied whose source has since been
+    deleted are removed, while anything else in destination (generated
+    pages) is left alone. With minify, stylesheets are copied through
+    minify_css, and their copies are compared by mtime only.
+
+    Given an asset_manifest_path, assets (see FINGERPRINT_EXTENSIONS) are
+    published under content-hashed names instead, mapped from their own
+    names in that JSON file. Stylesheets go last, with their url()s
+    rewritten, and are reprocessed every time since the assets they point
+    at may have been renamed. Returns a dict counting copied, skipped and
+    removed files, plus the bytes minifying saved as saved_bytes when
+    minify is set.
+    """
+    stats = {"copied": 0, "skipped": 0, "removed": 0}
+    if minify:
+        stats["saved_bytes"] = 0
+    previous = load_static_manifest(manifest_path)
+    # Stylesheets copied the other way round must be redone
+    restyle = previous.get("minify", False) != minify
+    fingerprint = asset_manifest_path is not None
+    previous_assets = load_assets(asset_manifest_path) if fingerprint else {}
+    files = list(scan_files(source))
+    if fingerprint:
+        files.sort(key=lambda item: item[0].endswith(".css"))
+    outputs, assets, made_dirs = [], {}, set()
+    for rel_path, source_stat in files:
+        source_path = os.path.join(source, rel_path)
+        name = rel_path.replace(os.sep, "/")
+        is_css = name.endswith(".css")
+        data, saved = None, 0
+        if fingerprint and name.endswith(FINGERPRINT_EXTENSIONS):
+            if is_css:
+                data, saved = stylesheet_output(source_path, name, minify, assets)
+                dest_name = fingerprint_path(name, hashlib.sha256(data).hexdigest())
+                # Named by content, so an existing file is up to date
+                unchanged = os.path.exists(os.path.join(destination, dest_name))
+            else:
+                dest_name = previous_assets.get(name)
+                unchanged = dest_name is not None and is_unchanged(
+                    source_path,
+                    source_stat,
+                    os.path.join(destination, dest_name),
+                    checksum,
+                )
+                if not unchanged:
+                    dest_name = fingerprint_path(name, hash_file(source_path))
+            assets[name] = dest_name
+        elif is_css and minify:
+            dest_name = name
+            try:
+                dest_stat = os.stat(os.path.join(destination, dest_name))
+                unchanged = not restyle and (
+                    dest_stat.st_mtime_ns == source_stat.st_mtime_ns
+                )
+            except FileNotFoundError:
+                unchanged = False
+        else:
+            dest_name = name
+            unchanged = not (is_css and restyle) and is_unchanged(
+                source_path, source_stat, os.path.join(destination, dest_name), checksum
+            )
+        outputs.append(dest_name)
+        if unchanged:
+            stats["skipped"] += 1
+            continue
+        dest_path = os.path.join(destination, dest_name)
+        dest_dir = os.path.dirname(dest_path)
+        if dest_dir not in made_dirs:
+            os.makedirs(dest_dir, exist_ok=True)
+            made_dirs.add(dest_dir)
+        if is_css and minify and data is None:
+            data, saved = stylesheet_output(source_path, name, minify, None)
+        if data is None:
+            logger.debug(f"Copying static file {rel_path} to {dest_name}")
+            shutil.copy2(source_path, dest_path)
+        else:
+            logger.debug(f"Writing processed static file {rel_path} to {dest_name}")
+            with open(dest_path, "wb") as file:
+                file.write(data)
+            # Like shutil.copy2, so the next sync can compare mtimes
+            os.utime(
+                dest_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns)
+            )
+            if minify:
+                stats["saved_bytes"] += saved
+        stats["copied"] += 1
+
+    for dest_name in set(previous["files"]).difference(outputs):
+        logger.debug(f"Removing stale static file {dest_name}")
+        remove_output(os.path.join(destination, dest_name), destination)
+        stats["removed"] += 1
+
+    save_manifest(
+        manifest_path,
+        {"version": STATIC_MANIFEST_VERSION, "files": sorted(outputs), "minify": minify},
+    )
+    if fingerprint:
+        save_manifest(asset_manifest_path, assets)
+    logger.info(f"Static sync finished: {stats}")
+    return stats
+
+
+def copy_static(
+    source: str,
+    output,
+    logger: logging.Logger,
+    minify: bool = False,
+    fingerprint: bool = False,
+) -> tuple:
+    """Write every file in source into output, such as an ArchiveOutput.
+
+    Files are named as if copied into output.root, in scan_files order.
+    minify and fingerprint process stylesheets and assets as sync_static
+    does. Returns a dict counting copied files, with saved_bytes when
+    minify is set, and the map of fingerprinted names (empty without
+    fingerprint).
+    """
+    stats = {"copied": 0}
+    if minify:
+        stats["saved_bytes"] = 0
+    files = list(scan_files(source))
+    if fingerprint:
+        files.sort(key=lambda item: item[0].endswith(".css"))
+    assets = {}
+    for rel_path, _ in files:
+        source_path = os.path.join(source, rel_path)
+        name = rel_path.replace(os.sep, "/")
+        dest_name, data = name, None
+        if name.endswith(".css") and (minify or fingerprint):
+            data, saved = stylesheet_output(source_path, name, minify, assets)
+            if minify:
+                stats["saved_bytes"] += saved
+        if fingerprint and name.endswith(FINGERPRINT_EXTENSIONS):
+            if data is None:
+                digest = hash_file(source_path)
+            else:
+                digest = hashlib.sha256(data).hexdigest()
+            dest_name = fingerprint_path(name, digest)
+            assets[name] = dest_name
+        logger.debug(f"Adding static file {rel_path} as {dest_name}")
+        dest_path = os.path.join(output.root, dest_name)
+        if data is None:
+            output.add_file(dest_path, source_path)
+        else:
+            output.write(dest_path, data)
+        stats["copied"] += 1
+    logger.info(f"Static copy finished: {stats}")
+    return stats, assets
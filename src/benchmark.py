@@ -0,0 +1,303 @@
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from typing import Iterable, Iterator
+from functions import (
+    INLINE_CACHE,
+    extract_title,
+    lex_blocks,
+    markdown_to_blocks,
+    markdown_to_html_node,
+    ordered_list_items,
+    text_to_text_nodes,
+)
+from project import Project
+from template import compile_template
+from traverse import scan_tree
+
+logger = logging.getLogger(__name__)
+
+WORDS = (
+    "sidewinder static site generator markdown python page content build fast "
+    "render template block inline node tree list quote code link image header "
+    "snake desert sand wind river stone cloud light shadow signal theory data"
+).split()
+PAGES_PER_DIR = 100
+TEMPLATE = """<!doctype html>
+<html>
+  <head>
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <main>{{ Content }}</main>
+  </body>
+</html>
+"""
+
+
+def random_sentence(rng: random.Random, inline=True) -> str:
+    """A sentence of plain words, with a realistic sprinkling of inline markup."""
+    words = rng.choices(WORDS, k=rng.randint(6, 18))
+    if inline:
+        for index in rng.sample(range(len(words)), rng.randint(0, 3)):
+            word = words[index]
+            words[index] = rng.choice(
+                (
+                    f"**{word}**",
+                    f"*{word}*",
+                    f"`{word}()`",
+                    f"[{word}](https://example.com/{word})",
+                    f"![{word}](/images/{word}.png)",
+                )
+            )
+    return " ".join(words).capitalize() + "."
+
+
+def random_block(rng: random.Random) -> str:
+    kind = rng.choices(
+        ("paragraph", "heading", "unordered", "ordered", "code", "quote"),
+        weights=(45, 15, 15, 10, 10, 5),
+    )[0]
+    if kind == "heading":
+        return "#" * rng.randint(2, 4) + " " + random_sentence(rng, inline=False)
+    elif kind == "unordered":
+        items = range(rng.randint(2, 8))
+        return "\n".join(f"* {random_sentence(rng)}" for _ in items)
+    elif kind == "ordered":
+        items = range(1, rng.randint(3, 9))
+        return "\n".join(f"{number}. {random_sentence(rng)}" for number in items)
+    elif kind == "code":
+        lines = [
+            "    " + " ".join(rng.choices(WORDS, k=5))
+            for _ in range(rng.randint(2, 12))
+        ]
+        return "\n".join(["```python", "def main():", *lines, "```"])
+    elif kind == "quote":
+        lines = range(rng.randint(1, 4))
+        return "\n".join(f"> {random_sentence(rng)}" for _ in lines)
+    else:
+        return "\n".join(random_sentence(rng) for _ in range(rng.randint(1, 5)))
+
+
+def random_page(rng: random.Random, index: int) -> str:
+    # Most pages are short, a few are long reference pages
+    num_blocks = int(rng.lognormvariate(3, 0.8)) + 1
+    blocks = [f"# Page {index}: {random_sentence(rng, inline=False)}"]
+    blocks.extend(random_block(rng) for _ in range(num_blocks))
+    return "\n\n".join(blocks) + "\n"
+
+
+def generate_corpus(root: str, pages: int, seed: int = 0) -> None:
+    """Write a synthetic project (content, static, template) under root."""
+    rng = random.Random(seed)
+    content = os.path.join(root, "content")
+    static = os.path.join(root, "static")
+    os.makedirs(static, exist_ok=True)
+    with open(os.path.join(root, "template.html"), "w") as file:
+        file.write(TEMPLATE)
+    with open(os.path.join(static, "index.css"), "w") as file:
+        file.write("body { font-family: sans-serif; }\n")
+    for index in range(pages):
+        page_dir = os.path.join(content, f"section{index // PAGES_PER_DIR:04d}")
+        if index % PAGES_PER_DIR == 0:
+            os.makedirs(page_dir, exist_ok=True)
+        with open(os.path.join(page_dir, f"page{index:06d}.md"), "w") as file:
+            file.write(random_page(rng, index))
+
+
+def iter_corpus(root: str) -> Iterator[str]:
+    """Yield the markdown of each corpus page in turn, in scan_tree order."""
+    for _, entry in scan_tree(os.path.join(root, "content")):
+        with open(entry.path, "r") as file:
+            yield file.read()
+
+
+def read_corpus(root: str) -> list:
+    return list(iter_corpus(root))
+
+
+def corpus_bytes(root: str) -> int:
+    content = os.path.join(root, "content")
+    return sum(entry.stat().st_size for _, entry in scan_tree(content))
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - started, result
+
+
+def inline_texts(markdown: str) -> list:
+    """The inline markdown of every paragraph and list item in markdown."""
+    texts = []
+    for block_type, block_lines in lex_blocks(markdown):
+        if block_type == "paragraph":
+            texts.append("\n".join(block_lines))
+        elif block_type == "unordered_list":
+            texts.extend(line[2:] for line in block_lines)
+        elif block_type == "ordered_list":
+            texts.extend(ordered_list_items(block_lines))
+    return texts
+
+
+def bench_stages(documents: Iterable[str], prettify=True, output_bytes=None) -> dict:
+    """Time each parse/render stage over every document, in seconds.
+
+    Documents go through every stage one at a time, with each stage's time
+    summed over them, so memory use doesn't grow with the corpus and
+    documents can be read lazily (see iter_corpus). Pages are templated
+    from their pretty html, as builds do by default. The inline fragment
+    cache starts out empty, so its counters afterwards describe this
+    corpus. A dict passed as output_bytes receives the size of the corpus
+    rendered in each output format.
+    """
+    try:
+        from bs4 import BeautifulSoup
+    except ImportError:
+        prettify = False
+    with tempfile.TemporaryDirectory() as tmp:
+        template_path = os.path.join(tmp, "template.html")
+        with open(template_path, "w") as file:
+            file.write(TEMPLATE)
+        template = compile_template(template_path)
+    formats = ("compact", "pretty", "minify")
+    results = dict.fromkeys(
+        ["markdown_to_blocks", "text_to_text_nodes", "markdown_to_html_node"]
+        + [f"to_html_{fmt}" for fmt in formats]
+        + ["templating"],
+        0.0,
+    )
+    if prettify:
+        results["bs4_prettify"] = 0.0
+    sizes = dict.fromkeys(formats, 0)
+    INLINE_CACHE.clear()
+    for markdown in documents:
+        seconds, _ = timed(markdown_to_blocks, markdown)
+        results["markdown_to_blocks"] += seconds
+        texts = inline_texts(markdown)
+        seconds, _ = timed(lambda: [text_to_text_nodes(text) for text in texts])
+        results["text_to_text_nodes"] += seconds
+        seconds, node = timed(markdown_to_html_node, markdown)
+        results["markdown_to_html_node"] += seconds
+        for fmt in formats:
+            seconds, html = timed(node.to_html, fmt)
+            results[f"to_html_{fmt}"] += seconds
+            sizes[fmt] += len(html.encode("utf-8"))
+            if fmt == "pretty":
+                pretty = html
+        values = {"Title": extract_title(markdown, ".md"), "Content": pretty}
+        seconds, page = timed(template.render, values)
+        results["templating"] += seconds
+        if prettify:
+            # The BeautifulSoup pass pages used to go through, for comparison
+            seconds, _ = timed(
+                lambda: BeautifulSoup(page, "html.parser").prettify(formatter="html5")
+            )
+            results["bs4_prettify"] += seconds
+    if output_bytes is not None:
+        output_bytes.update(sizes)
+    return results
+
+
+def bench_builds(root: str, jobs: int) -> dict:
+    """Time a from-scratch build and a no-op incremental build of root."""
+    project = Project(root, logger, jobs=jobs)
+    results = {}
+    # Keep the per-page progress lines out of the timings
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results["full_build"], stats = timed(project.build)
+        results["noop_rebuild"], _ = timed(project.build, True)
+    if stats["failed"]:
+        raise ValueError(f"{stats['failed']} corpus page(s) failed to build")
+    return results
+
+
+def git_commit() -> str | None:
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+    except OSError:
+        return None
+    return output.stdout.strip() or None
+
+
+def run(pages: int, seed: int, jobs: int, builds=True, prettify=True) -> dict:
+    with tempfile.TemporaryDirectory() as root:
+        generate_corpus(root, pages, seed)
+        output_bytes = {}
+        seconds = bench_stages(iter_corpus(root), prettify, output_bytes)
+        inline_cache = INLINE_CACHE.stats()
+        input_bytes = corpus_bytes(root)
+        if builds:
+            seconds.update(bench_builds(root, jobs))
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "pages": pages,
+        "bytes": input_bytes,
+        "output_bytes": output_bytes,
+        "seed": seed,
+        "jobs": jobs,
+        "seconds": {stage: round(value, 6) for stage, value in seconds.items()},
+        "inline_cache": inline_cache,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark Sidewinder on a synthetic corpus."
+    )
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-j", "--jobs", type=int, default=1)
+    parser.add_argument(
+        "--stages-only", action="store_true", help="skip the full site builds"
+    )
+    parser.add_argument(
+        "--skip-prettify",
+        action="store_true",
+        help="skip timing the old BeautifulSoup prettify pass, which is slow",
+    )
+    parser.add_argument(
+        "--output",
+        default="bench_results.jsonl",
+        help="file each run's results are appended to as one json line",
+    )
+    parser.add_argument(
+        "--corpus", help="only write a corpus project into this directory"
+    )
+    args = parser.parse_args(argv)
+    if args.corpus:
+        generate_corpus(args.corpus, args.pages, args.seed)
+        return
+    result = run(
+        args.pages,
+        args.seed,
+        args.jobs,
+        builds=not args.stages_only,
+        prettify=not args.skip_prettify,
+    )
+    with open(args.output, "a") as file:
+        file.write(json.dumps(result, sort_keys=True) + "\n")
+    for stage, seconds in result["seconds"].items():
+        per_page = seconds / args.pages * 1e6
+        print(f"{stage:>22}: {seconds:9.3f}s {per_page:10.1f}us/page")
+    print(f"Inline cache: {result['inline_cache']}")
+
+
+if __name__ == "__main__":
+    main()
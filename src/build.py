@@ -0,0 +1,339 @@
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functions import generate_page, output_conflicts, page_output_path, plan_pages
+from template import Template, load_template
+from profiling import PageProfiler
+from cache import ParseCache
+from output import BufferedOutput
+
+MANIFEST_VERSION = 1
+
+
+def hash_file(path: str) -> str:
+    """Return the sha256 hex digest of the file at path."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def empty_manifest() -> dict:
+    return {"version": MANIFEST_VERSION, "template": None, "pages": {}}
+
+
+def load_manifest(manifest_path: str) -> dict:
+    """Read a build manifest, falling back to an empty one if unusable."""
+    try:
+        with open(manifest_path, "r") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return empty_manifest()
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return empty_manifest()
+    return manifest
+
+
+def save_manifest(manifest_path: str, manifest: dict) -> None:
+    """Atomically write the build manifest next to its final location."""
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as file:
+        # Compact, manifests of large sites run to megabytes
+        json.dump(manifest, file, separators=(",", ":"), sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def source_fingerprint(path: str, previous: dict | None) -> dict:
+    """Stat the source, only re-hashing it if size or mtime changed."""
+    stat = os.stat(path)
+    if (
+        previous
+        and previous.get("size") == stat.st_size
+        and previous.get("mtime_ns") == stat.st_mtime_ns
+    ):
+        source_hash = previous["hash"]
+    else:
+        source_hash = hash_file(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": source_hash}
+
+
+def remove_output(html_path: str, public: str) -> None:
+    """Delete a stale output, then any parent dirs it leaves empty."""
+    if os.path.exists(html_path):
+        os.remove(html_path)
+    parent = os.path.dirname(html_path)
+    while os.path.normpath(parent) != os.path.normpath(public):
+        try:
+            os.rmdir(parent)
+        except OSError:
+            # Directory still holds other outputs or static files
+            break
+        parent = os.path.dirname(parent)
+
+
+def resolve_jobs(jobs: int | None) -> int:
+    """Map a --jobs value to a worker count; 0 or None means every core."""
+    if not jobs:
+        return os.cpu_count() or 1
+    if jobs < 0:
+        raise ValueError(f"Invalid job count: {jobs}")
+    return jobs
+
+
+def _generate_page_job(job):
+    (
+        markup_path,
+        template,
+        html_path,
+        logger,
+        fmt,
+        profiler,
+        cache,
+        strict_html,
+        output,
+    ) = job
+    failure, saved_bytes = None, 0
+    try:
+        saved_bytes = generate_page(
+            markup_path,
+            template,
+            html_path,
+            logger,
+            fmt=fmt,
+            profiler=profiler,
+            cache=cache,
+            strict_html=strict_html,
+            output=output,
+        )
+    except Exception as e:
+        failure = markup_path, f"{type(e).__name__}: {e}"
+    return failure, saved_bytes, profiler, output
+
+
+def generate_pages(
+    plan: list,
+    template_path: str,
+    logger: logging.Logger,
+    jobs: int = 1,
+    fmt: str = "pretty",
+    profiler: PageProfiler | None = None,
+    cache: ParseCache | None = None,
+    strict_html: bool = False,
+    template: Template | None = None,
+    output=None,
+    stats: dict | None = None,
+) -> list:
+    """Generate every (markup_path, html_path) pair in plan.
+
+    Output directories are created up front so workers only write files.
+    With jobs > 1 pages are spread over a process pool. Failures don't stop
+    the build; they're returned as (markup_path, error message) pairs.
+    Per-page stage timings are gathered into profiler, if given, and pages
+    whose markup is in cache reuse their parsed content. strict_html
+    validates html input with BeautifulSoup as well. A compiled template
+    passed as template is used instead of loading template_path.
+
+    Pages go into output instead of to disk if given, say an ArchiveOutput,
+    in plan order even with jobs > 1: workers then render into a
+    BufferedOutput each, copied into output as their results come in.
+    The bytes the minify format saved are added to stats["saved_bytes"],
+    given a stats dict.
+    """
+    jobs = min(resolve_jobs(jobs), max(len(plan), 1))
+    buffered = output is not None and jobs > 1
+    if output is None:
+        for html_dir in sorted({os.path.dirname(path) for _, path in plan}):
+            os.makedirs(html_dir, exist_ok=True)
+    # Compile (or reuse) once here; workers receive the compiled form
+    if template is None:
+        template = load_template(template_path)
+    work = [
+        (
+            markup_path,
+            template,
+            html_path,
+            logger,
+            fmt,
+            None if profiler is None else profiler.worker_copy(),
+            cache,
+            strict_html,
+            BufferedOutput(output.root) if buffered else output,
+        )
+        for markup_path, html_path in plan
+    ]
+    failures = []
+
+    def collect(results):
+        for failure, saved_bytes, page_profiler, page_output in results:
+            if failure is not None:
+                failures.append(failure)
+            if stats is not None:
+                stats["saved_bytes"] = stats.get("saved_bytes", 0) + saved_bytes
+            if page_profiler is not None:
+                profiler.merge(page_profiler)
+            if buffered:
+                page_output.copy_to(output)
+
+    if jobs == 1:
+        collect(map(_generate_page_job, work))
+    else:
+        # Big chunks keep IPC overhead low, several per worker keep them busy
+        chunksize = max(1, len(work) // (jobs * 8))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            collect(executor.map(_generate_page_job, work, chunksize=chunksize))
+    for markup_path, message in failures:
+        logger.error(f"Failed to generate {markup_path}: {message}")
+    return failures
+
+
+def with_namesakes(sources) -> set:
+    """sources, and the files next to them generating the same page."""
+    paths = set(sources)
+    for path in sources:
+        directory, name = os.path.split(path)
+        stem = os.path.splitext(name)[0]
+        try:
+            with os.scandir(directory) as entries:
+                paths.update(
+                    entry.path
+                    for entry in entries
+                    if os.path.splitext(entry.name)[0] == stem and entry.is_file()
+                )
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+    return paths
+
+
+def build_incremental(
+    content: str,
+    template_path: str,
+    public: str,
+    manifest_path: str,
+    logger: logging.Logger,
+    jobs: int = 1,
+    fmt: str = "pretty",
+    sources: list | None = None,
+    profiler: PageProfiler | None = None,
+    cache: ParseCache | None = None,
+    strict_html: bool = False,
+    assets: dict | None = None,
+) -> dict:
+    """Regenerate only pages whose source or template changed.
+
+    Outputs whose sources were deleted since the previous build are pruned.
+    When sources lists markup paths (say, from a file watcher) only those
+    are checked and every other page is carried over from the manifest,
+    unless the template changed. A ParseCache passed as cache is trimmed
+    to its size cap afterwards. References to the fingerprinted assets in
+    assets are rewritten, and every page is rebuilt when their names
+    change. Sources generating the same page, such as x.md and x.html,
+    both fail. Returns a dict counting built, skipped, pruned and failed
+    pages, and the bytes minifying them saved.
+    """
+    previous = load_manifest(manifest_path)
+    manifest = empty_manifest()
+    template = load_template(template_path)
+    if assets:
+        template = template.with_assets(assets, public)
+    manifest["template"] = template.digest
+    manifest["format"] = fmt
+    template_changed = (
+        manifest["template"] != previous["template"]
+        or manifest["format"] != previous.get("format")
+    )
+    if template_changed:
+        logger.info("Template or output format changed, rebuilding every page")
+        sources = None
+
+    if sources is None:
+        plan = plan_pages(content, public)
+    else:
+        manifest["pages"].update(previous["pages"])
+        plan = []
+        # A page one of them clashed with may build, or clash, again
+        for markup_path in sorted(with_namesakes(sources)):
+            if os.path.isfile(markup_path):
+                plan.append(
+                    (markup_path, page_output_path(markup_path, content, public))
+                )
+            else:
+                manifest["pages"].pop(os.path.relpath(markup_path, content), None)
+
+    outputs = {
+        source: entry.get("output") for source, entry in manifest["pages"].items()
+    }
+    for markup_path, html_path in plan:
+        outputs[os.path.relpath(markup_path, content)] = os.path.relpath(
+            html_path, public
+        )
+    conflicts = output_conflicts(outputs)
+    failures = []
+    for source, message in sorted(conflicts.items()):
+        logger.error(f"Failed to generate {source}: {message}")
+        failures.append((os.path.join(content, source), message))
+
+    stats = {"built": 0, "skipped": 0, "pruned": 0, "failed": 0, "saved_bytes": 0}
+    dirty = []
+    for markup_path, html_path in plan:
+        source = os.path.relpath(markup_path, content)
+        if source in conflicts:
+            continue
+        old_entry = previous["pages"].get(source)
+        entry = source_fingerprint(markup_path, old_entry)
+        entry["output"] = os.path.relpath(html_path, public)
+        manifest["pages"][source] = entry
+        if (
+            not template_changed
+            and old_entry is not None
+            and old_entry["hash"] == entry["hash"]
+            and old_entry.get("output") == entry["output"]
+            and os.path.exists(html_path)
+        ):
+            stats["skipped"] += 1
+            continue
+        dirty.append((markup_path, html_path))
+
+    page_failures = generate_pages(
+        dirty,
+        template_path,
+        logger,
+        jobs,
+        fmt,
+        profiler,
+        cache,
+        strict_html,
+        template,
+        stats=stats,
+    )
+    failures.extend(page_failures)
+    if cache is not None:
+        cache.evict(logger)
+    failed_sources = set()
+    for markup_path, _ in failures:
+        # Forget failed pages so the next build retries them
+        failed_sources.add(os.path.relpath(markup_path, content))
+        manifest["pages"].pop(os.path.relpath(markup_path, content), None)
+    stats["built"] = len(dirty) - len(page_failures)
+    stats["failed"] = len(failures)
+
+    live_outputs = {entry["output"] for entry in manifest["pages"].values()}
+    for source, old_entry in previous["pages"].items():
+        output = old_entry.get("output")
+        if (
+            source in manifest["pages"]
+            or source in failed_sources
+            or output is None
+            or output in live_outputs
+        ):
+            continue
+        logger.info(f"Pruning {output}, source {source} was removed")
+        remove_output(os.path.join(public, output), public)
+        stats["pruned"] += 1
+
+    save_manifest(manifest_path, manifest)
+    logger.info(f"Incremental build finished: {stats}")
+    return stats
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+
+PARSE_CACHE_BYTES = 256 * 1024 * 1024
+
+
+class ParseCache:
+    """Parsed page titles and rendered content, kept on disk between builds.
+
+    Entries are keyed by a hash of the markup and of everything else the
+    rendering depends on (see key), so a template-only change only has to
+    re-run templating. Reading an entry marks it as recently used by
+    touching its mtime, and evict() drops the least recently used entries
+    once the cache outgrows max_bytes. Workers in other processes can share
+    one cache since every entry is written atomically.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = PARSE_CACHE_BYTES) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def __repr__(self) -> str:
+        return f"ParseCache({self.directory}, max bytes: {self.max_bytes})"
+
+    def key(self, markup: str, *context) -> str:
+        """Hash markup together with the context it was rendered in."""
+        digest = hashlib.sha256()
+        for part in context:
+            digest.update(f"{part}\0".encode("utf-8"))
+        digest.update(markup.encode("utf-8"))
+        return digest.hexdigest()
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key: str) -> tuple | None:
+        """Return the cached (title, content), or None on a miss."""
+        path = self.entry_path(key)
+        try:
+            with open(path, "r") as file:
+                entry = json.load(file)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry["title"], entry["content"]
+
+    def put(self, key: str, title: str, content: str) -> None:
+        entry = json.dumps({"title": title, "content": content})
+        if len(entry) > self.max_bytes:
+            return
+        path = self.entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as file:
+            file.write(entry)
+        os.replace(tmp_path, path)
+
+    def block_memo(self, markup_path: str, *context) -> "BlockMemo":
+        """The memo of rendered blocks for the page at markup_path."""
+        name = hashlib.sha256(os.path.abspath(markup_path).encode("utf-8"))
+        path = os.path.join(self.directory, "blocks", name.hexdigest() + ".json")
+        return BlockMemo(path, "\0".join(str(part) for part in context))
+
+    def evict(self, logger: logging.Logger | None = None) -> int:
+        """Remove least recently used entries until under max_bytes."""
+        entries, total = [], 0
+        if not os.path.isdir(self.directory):
+            return 0
+        with os.scandir(self.directory) as shards:
+            for shard in shards:
+                if not shard.is_dir():
+                    continue
+                with os.scandir(shard.path) as files:
+                    for entry in files:
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                        total += stat.st_size
+        if total <= self.max_bytes:
+            return 0
+        entries.sort()
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        if logger is not None:
+            logger.info(f"Evicted {removed} parse cache entries")
+        return removed
+
+
+class BlockMemo:
+    """Rendered html of each block of one page, by hash of the block source.
+
+    A page whose markup changed only re-renders the blocks that changed.
+    Entries only hold for the context (parser version, format and so on)
+    they were rendered in, and save() keeps just the blocks looked up since
+    loading, so blocks deleted from the page don't pile up.
+    """
+
+    def __init__(self, path: str, context: str) -> None:
+        self.path = path
+        self.context = context
+        self.blocks = {}
+        self.hits = 0
+        self.misses = 0
+        try:
+            with open(path, "r") as file:
+                memo = json.load(file)
+        except (OSError, ValueError):
+            memo = {}
+        if memo.get("context") != context:
+            memo = {}
+        self.previous = memo.get("blocks", {})
+
+    def __repr__(self) -> str:
+        return f"BlockMemo({self.path}, hits: {self.hits}, misses: {self.misses})"
+
+    def key(self, block_type: str, block_lines: list) -> str:
+        source = block_type + "\n" + "\n".join(block_lines)
+        return hashlib.blake2b(source.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        html = self.previous.get(key)
+        if html is None:
+            html = self.blocks.get(key)
+        if html is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.blocks[key] = html
+        return html
+
+    def put(self, key: str, html: str) -> None:
+        self.blocks[key] = html
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        # json.dumps takes the C encoder, json.dump to a file does not
+        memo = json.dumps({"context": self.context, "blocks": self.blocks})
+        with open(tmp_path, "w") as file:
+            file.write(memo)
+        os.replace(tmp_path, self.path)
+
+
+class LRUCache:
+    """A bounded in-memory mapping that forgets the least recently used key.
+
+    hits and misses count get() calls, to judge whether max_entries fits
+    the content it caches.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self) -> str:
+        return f"LRUCache({self.stats()})"
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key):
+        """Return the value cached under key, or None."""
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value) -> None:
+        if self.max_entries <= 0:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import socket
+
+# Kept to the standard library so a request starts in a few milliseconds,
+# everything heavy is already loaded in the daemon (see daemon.py)
+
+
+def find_root() -> str:
+    """The project root, as main.py picks it: the cwd, or its parent in 'src'."""
+    cwd = os.getcwd()
+    if os.path.basename(cwd) == "src":
+        return os.path.dirname(cwd)
+    return cwd
+
+
+def socket_path(root: str) -> str:
+    return os.path.join(root, ".sidewinder", "daemon.sock")
+
+
+def read_message(file) -> dict:
+    """Read one newline terminated JSON message."""
+    line = file.readline()
+    if not line:
+        raise ValueError("Connection closed before a message was received")
+    return json.loads(line)
+
+
+def write_message(file, message: dict) -> None:
+    file.write(json.dumps(message).encode("utf-8") + b"\n")
+    file.flush()
+
+
+def send_request(path: str, request: dict, timeout: float | None = None) -> dict:
+    """Send one request to the daemon listening at path and return its reply."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(timeout)
+        connection.connect(path)
+        with connection.makefile("rwb") as file:
+            write_message(file, request)
+            return read_message(file)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="sidewinder-client",
+        description="Send a request to the build daemon started by 'main.py --daemon'.",
+    )
+    parser.add_argument(
+        "command",
+        choices=("build", "rebuild", "ping", "stop"),
+        help="build the site, rebuild what depends on PATHs, check or stop the daemon",
+    )
+    parser.add_argument("paths", nargs="*", metavar="PATH", help="changed files")
+    parser.add_argument(
+        "--clean",
+        action="store_true",
+        help="with build, rebuild every page and remove stale files from 'public'",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    root = find_root()
+    request = {"command": args.command}
+    if args.command == "build":
+        request["incremental"] = not args.clean
+    elif args.command == "rebuild":
+        if not args.paths:
+            raise SystemExit("rebuild needs at least one PATH")
+        request["paths"] = [os.path.abspath(path) for path in args.paths]
+    try:
+        response = send_request(socket_path(root), request)
+    except (FileNotFoundError, ConnectionRefusedError):
+        raise SystemExit(
+            f"No build daemon running for {root}, start one with 'main.py --daemon'"
+        )
+    if not response["ok"]:
+        raise SystemExit(f"Daemon error: {response['error']}")
+    if "profile" in response:
+        print(response["profile"])
+    if "stats" in response:
+        stats = response["stats"]
+        print(f"Built in {response['ms']:.0f} ms: {stats}")
+        if stats["failed"]:
+            raise SystemExit(f"{stats['failed']} page(s) failed, see the log")
+    else:
+        print(f"Daemon {response['pid']}: {response['builds']} build(s) served")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import gzip
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from build import resolve_jobs, save_manifest
+from output import write_if_changed
+from traverse import scan_files
+
+GZIP_MANIFEST_VERSION = 1
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".svg", ".json")
+# Below this, gzip headers and a request's overhead outweigh the savings
+GZIP_MIN_BYTES = 1024
+
+
+def load_compressed(manifest_path: str) -> dict:
+    """Map each output compressed by the previous build to its [size, mtime]."""
+    try:
+        with open(manifest_path, "r") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("version") != GZIP_MANIFEST_VERSION:
+        return {}
+    return manifest["files"]
+
+
+def gzip_file(path: str) -> int:
+    """Write path.gz at maximum compression and return its size.
+
+    The gzip header's timestamp is zeroed so identical outputs give
+    identical .gz files, and an identical .gz isn't rewritten.
+    """
+    with open(path, "rb") as file:
+        data = gzip.compress(file.read(), compresslevel=9, mtime=0)
+    write_if_changed(path + ".gz", data)
+    return len(data)
+
+
+def precompress(
+    public: str,
+    manifest_path: str,
+    logger: logging.Logger,
+    jobs: int = 1,
+    min_bytes: int = GZIP_MIN_BYTES,
+) -> dict:
+    """Write a .gz next to every compressible output of min_bytes or more.
+
+    Outputs whose size and mtime match what the previous run compressed are
+    skipped. So are outputs below min_bytes, and a .gz written for such a
+    file earlier is removed, as is one whose output was deleted. .gz files
+    this didn't write are left alone. Returns a dict counting compressed,
+    skipped and removed files, and the bytes saved by every .gz written.
+    """
+    previous = load_compressed(manifest_path)
+    compressed, dirty = {}, []
+    stats = {"compressed": 0, "skipped": 0, "removed": 0, "saved_bytes": 0}
+    for rel_path, stat in scan_files(public):
+        if (
+            not rel_path.endswith(COMPRESSIBLE_EXTENSIONS)
+            or stat.st_size < min_bytes
+        ):
+            continue
+        state = [stat.st_size, stat.st_mtime_ns]
+        compressed[rel_path] = state
+        if previous.get(rel_path) == state and os.path.exists(
+            os.path.join(public, rel_path + ".gz")
+        ):
+            stats["skipped"] += 1
+        else:
+            dirty.append(rel_path)
+
+    jobs = min(resolve_jobs(jobs), max(len(dirty), 1))
+    paths = [os.path.join(public, rel_path) for rel_path in dirty]
+    # zlib releases the GIL while compressing, so threads are enough here
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        sizes = list(executor.map(gzip_file, paths))
+    for rel_path, size in zip(dirty, sizes):
+        stats["saved_bytes"] += compressed[rel_path][0] - size
+    stats["compressed"] = len(dirty)
+
+    for rel_path in set(previous).difference(compressed):
+        try:
+            os.remove(os.path.join(public, rel_path + ".gz"))
+        except FileNotFoundError:
+            continue
+        stats["removed"] += 1
+
+    save_manifest(
+        manifest_path, {"version": GZIP_MANIFEST_VERSION, "files": compressed}
+    )
+    logger.info(f"Precompression finished: {stats}")
+    return stats
+
+
+def remove_compressed(public: str, manifest_path: str, logger: logging.Logger) -> int:
+    """Delete every .gz precompress wrote, for builds with it turned off.
+
+    Otherwise a server preferring .gz files would keep serving the old
+    content of outputs rebuilt since. Returns how many were removed.
+    """
+    removed = 0
+    for rel_path in load_compressed(manifest_path):
+        try:
+            os.remove(os.path.join(public, rel_path + ".gz"))
+        except FileNotFoundError:
+            continue
+        removed += 1
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+        logger.info(f"Precompression off, removed {removed} .gz file(s)")
+    return removed
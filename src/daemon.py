@@ -0,0 +1,136 @@
+import os
+import socketserver
+import time
+from project import Project
+from serve import Watcher
+from client import read_message, send_request, socket_path, write_message
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    """Answer one JSON request per connection, see BuildDaemon.dispatch."""
+
+    def handle(self):
+        try:
+            response = self.server.dispatch(read_message(self.rfile))
+        except Exception as e:
+            self.server.project.logger.error(
+                f"Daemon request failed: {type(e).__name__}: {e}"
+            )
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        try:
+            write_message(self.wfile, response)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class BuildDaemon(socketserver.UnixStreamServer):
+    """Builds a project on request, keeping everything warm in between.
+
+    Listens on a Unix socket inside the project's '.sidewinder' directory,
+    readable by its owner only. The interpreter, imports, compiled template
+    and in-memory caches all outlive a request, so a request costs no more
+    than the build itself. Requests are handled one at a time, which keeps
+    builds from overlapping.
+
+    Where inotify is available, a Watcher keeps the directory index warm:
+    it notes the files changed between requests, so incremental builds
+    after the first only check those instead of walking content and
+    static. Outputs deleted from 'public' behind its back are only
+    restored by a clean build then.
+    """
+
+    def __init__(self, project: Project, notify=True) -> None:
+        self.project = project
+        self.builds = 0
+        self.stopping = False
+        self.watcher = None
+        self.warm = False  # whether a full build has run since watching began
+        path = socket_path(project.root)
+        claim_socket(path)
+        super().__init__(path, DaemonRequestHandler)
+        os.chmod(path, 0o600)
+        if notify:
+            watcher = Watcher(project, interval=0)
+            if watcher.notifier is not None:
+                self.watcher = watcher
+
+    def __repr__(self) -> str:
+        return f"BuildDaemon({self.server_address}, builds: {self.builds})"
+
+    def dispatch(self, request: dict) -> dict:
+        command = request.get("command")
+        if command in ("ping", "stop"):
+            self.stopping = command == "stop"
+            return {"ok": True, "pid": os.getpid(), "builds": self.builds}
+        profiler = self.project.profiler
+        if profiler is not None:
+            # Report per request rather than piling up records forever
+            profiler.records, profiler.slowest = [], []
+        started = time.perf_counter()
+        if command == "build":
+            stats = self.build(request.get("incremental", True))
+        elif command == "rebuild":
+            paths = request.get("paths")
+            if not isinstance(paths, list):
+                raise ValueError("rebuild needs a list of paths")
+            stats = self.project.rebuild_paths(paths)
+        else:
+            raise ValueError(f"Unknown daemon command: {command}")
+        if self.watcher is not None:
+            self.watcher.update_sources()
+        self.builds += 1
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"Build {self.builds} ({command}) in {elapsed:.0f} ms: {stats}")
+        response = {"ok": True, "stats": stats, "ms": elapsed}
+        if profiler is not None:
+            response["profile"] = profiler.report()
+        return response
+
+    def build(self, incremental: bool) -> dict:
+        """Build the project, checking only the files changed if watching."""
+        if self.watcher is None:
+            return self.project.build(incremental=incremental)
+        changed = self.watcher.changes()
+        if not incremental or not self.warm:
+            self.warm = True
+            return self.project.build(incremental=incremental)
+        stats = self.project.rebuild_paths(changed)
+        stats["deploy"] = self.project.write_deploy_manifest()
+        return stats
+
+    def serve_until_stopped(self) -> None:
+        try:
+            while not self.stopping:
+                self.handle_request()
+        finally:
+            self.server_close()
+
+    def server_close(self) -> None:
+        super().server_close()
+        if self.watcher is not None:
+            self.watcher.close()
+        try:
+            os.remove(self.server_address)
+        except FileNotFoundError:
+            pass
+
+
+def claim_socket(path: str) -> None:
+    """Make way for a new daemon at path, unless one is still listening there."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if not os.path.exists(path):
+        return
+    try:
+        send_request(path, {"command": "ping"}, timeout=1)
+    except (OSError, ValueError):
+        # Left behind by a daemon that didn't shut down cleanly
+        os.remove(path)
+        return
+    raise ValueError(f"A build daemon is already running on {path}")
+
+
+def serve_daemon(project: Project) -> None:
+    """Run a BuildDaemon for project until a client asks it to stop."""
+    daemon = BuildDaemon(project)
+    print(f"Build daemon listening on {daemon.server_address} (Ctrl+C to stop)")
+    daemon.serve_until_stopped()
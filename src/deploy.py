@@ -0,0 +1,82 @@
+import json
+import logging
+import os
+from build import hash_file, save_manifest
+from traverse import scan_files
+
+DEPLOY_MANIFEST_VERSION = 1
+
+
+def load_deploy_manifest(manifest_path: str) -> dict:
+    """Read a deploy manifest, falling back to an empty one if unusable."""
+    try:
+        with open(manifest_path, "r") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return {"version": DEPLOY_MANIFEST_VERSION, "files": {}}
+    if manifest.get("version") != DEPLOY_MANIFEST_VERSION:
+        return {"version": DEPLOY_MANIFEST_VERSION, "files": {}}
+    return manifest
+
+
+def scan_outputs(public: str, stat_cache: dict) -> tuple:
+    """Return the deploy manifest of public, and the stat cache behind it.
+
+    Manifest entries hold just each file's size and sha256, so the same
+    outputs always give the same manifest. stat_cache maps paths to the
+    [size, mtime, sha256] they were last hashed at, so only files whose
+    size or mtime changed are hashed again.
+    """
+    files, stats = {}, {}
+    for rel_path, stat in scan_files(public):
+        name = rel_path.replace(os.sep, "/")
+        cached = stat_cache.get(name)
+        if cached is not None and cached[:2] == [stat.st_size, stat.st_mtime_ns]:
+            digest = cached[2]
+        else:
+            digest = hash_file(os.path.join(public, rel_path))
+        files[name] = {"size": stat.st_size, "sha256": digest}
+        stats[name] = [stat.st_size, stat.st_mtime_ns, digest]
+    manifest = {"version": DEPLOY_MANIFEST_VERSION, "files": files}
+    return manifest, stats
+
+
+def diff_manifests(previous: dict, current: dict) -> dict:
+    """List the files added, changed and deleted between two manifests."""
+    old, new = previous["files"], current["files"]
+    return {
+        "added": sorted(set(new).difference(old)),
+        "changed": sorted(
+            path for path in set(new).intersection(old) if new[path] != old[path]
+        ),
+        "deleted": sorted(set(old).difference(new)),
+    }
+
+
+def write_deploy_manifest(
+    public: str,
+    manifest_path: str,
+    diff_path: str,
+    stat_cache_path: str,
+    logger: logging.Logger,
+) -> dict:
+    """Record what public holds now, and how it differs from last time.
+
+    The manifest and the diff from the previous manifest are saved as JSON,
+    so a deploy can upload just the added and changed files and delete the
+    deleted ones. Returns counts of added, changed and deleted files.
+    """
+    try:
+        with open(stat_cache_path, "r") as file:
+            stat_cache = json.load(file)
+    except (OSError, ValueError):
+        stat_cache = {}
+    previous = load_deploy_manifest(manifest_path)
+    manifest, stat_cache = scan_outputs(public, stat_cache)
+    diff = diff_manifests(previous, manifest)
+    save_manifest(manifest_path, manifest)
+    save_manifest(diff_path, diff)
+    save_manifest(stat_cache_path, stat_cache)
+    counts = {change: len(paths) for change, paths in diff.items()}
+    logger.info(f"Deploy manifest written: {counts}")
+    return counts
@@ -0,0 +1,196 @@
+from array import array
+from htmlnode import (
+    BLOCK_TAGS,
+    INDENT,
+    PRESERVE_TAGS,
+    WHITESPACE_PATTERN,
+    check_format,
+)
+
+# Node kinds are indexes into TAGS, None being a bare run of text
+TAGS = (
+    None, "div", "p", "h1", "h2", "h3", "h4", "h5", "h6", "pre", "code",
+    "blockquote", "ul", "ol", "li", "b", "i", "a", "img",
+)
+KINDS = {tag: kind for kind, tag in enumerate(TAGS)}
+# Kinds whose nodes hold children instead of text
+PARENT_KINDS = frozenset(
+    KINDS[tag] for tag in ("div", "p", "pre", "blockquote", "ul", "ol", "li")
+)
+BLOCK_KINDS = frozenset(KINDS[tag] for tag in BLOCK_TAGS if tag in KINDS)
+PRESERVE_KINDS = frozenset(KINDS[tag] for tag in PRESERVE_TAGS if tag in KINDS)
+LINK, IMAGE = KINDS["a"], KINDS["img"]
+OPEN_TAGS = tuple(f"<{tag}>" for tag in TAGS)
+CLOSE_TAGS = tuple(f"</{tag}>" for tag in TAGS)
+
+
+class Document:
+    """An html tree stored as flat arrays instead of one object per node.
+
+    Nodes are kept in document order. Each has a kind (see TAGS), the span
+    of its text in the document's text buffer, the span of its attribute
+    (a link's href or an image's src, whose alt is the text) and the index
+    just past its subtree, so a parent's children run from index + 1 to
+    there. Memory grows with the size of the text rather than with the
+    number of Python objects, and render_into writes the same markup as
+    the equivalent HTMLNode tree.
+    """
+
+    def __init__(self) -> None:
+        self.kinds = array("B")
+        self.starts = array("I")
+        self.ends = array("I")
+        self.attr_starts = array("I")
+        self.attr_ends = array("I")
+        self.subtree_ends = array("I")
+        self.chunks = []
+        self.text_length = 0
+
+    def __repr__(self) -> str:
+        return f"Document({len(self)} nodes, {self.text_length} chars)"
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    @property
+    def text(self) -> str:
+        """The text buffer every node's spans point into."""
+        if len(self.chunks) != 1:
+            self.chunks = ["".join(self.chunks)]
+        return self.chunks[0]
+
+    def nbytes(self) -> int:
+        """Bytes held by the node arrays, leaving out the text buffer."""
+        columns = (
+            self.kinds,
+            self.starts,
+            self.ends,
+            self.attr_starts,
+            self.attr_ends,
+            self.subtree_ends,
+        )
+        return sum(column.itemsize * len(column) for column in columns)
+
+    def add_text(self, text: str) -> int:
+        """Append text to the buffer, returning the offset it starts at."""
+        offset = self.text_length
+        self.chunks.append(text)
+        self.text_length += len(text)
+        return offset
+
+    def open(self, tag) -> int:
+        """Start a parent node, its children are added until close(index)."""
+        return self.add_node(KINDS[tag], 0, 0)
+
+    def close(self, index: int) -> None:
+        self.subtree_ends[index] = len(self.kinds)
+
+    def leaf(self, tag, start, end, attr_start=0, attr_end=0) -> int:
+        return self.add_node(KINDS[tag], start, end, attr_start, attr_end)
+
+    def add_node(self, kind, start, end, attr_start=0, attr_end=0) -> int:
+        index = len(self.kinds)
+        self.kinds.append(kind)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.attr_starts.append(attr_start)
+        self.attr_ends.append(attr_end)
+        self.subtree_ends.append(index + 1)
+        return index
+
+    def to_html(self, fmt="compact", indent="") -> str:
+        chunks = []
+        self.render_into(chunks.append, fmt, indent)
+        return "".join(chunks)
+
+    def render_into(self, write, fmt="compact", indent="", separator="") -> None:
+        """Serialize every top level node, see HTMLNode.render_into.
+
+        separator is written before each top level node.
+        """
+        check_format(fmt)
+        text = self.text
+        index = 0
+        while index < len(self.kinds):
+            if separator:
+                write(separator)
+            if fmt == "pretty":
+                self.render_pretty(text, index, write, indent)
+            else:
+                self.render_compact(text, index, write, fmt == "minify", False)
+            index = self.subtree_ends[index]
+
+    def open_tag(self, text, index) -> str:
+        kind = self.kinds[index]
+        if kind == LINK:
+            href = text[self.attr_starts[index] : self.attr_ends[index]]
+            return f'<a href="{href}">'
+        elif kind == IMAGE:
+            src = text[self.attr_starts[index] : self.attr_ends[index]]
+            alt = text[self.starts[index] : self.ends[index]]
+            return f'<img src="{src}" alt="{alt}">'
+        return OPEN_TAGS[kind]
+
+    def render_compact(self, text, index, write, minify, preserve) -> None:
+        """Write the subtree at index in one pass over the arrays."""
+        kinds, starts, ends = self.kinds, self.starts, self.ends
+        subtree_ends = self.subtree_ends
+        open_parents = []  # (subtree end, closing tag, enclosing preserve)
+        for node in range(index, subtree_ends[index]):
+            while open_parents and open_parents[-1][0] <= node:
+                _, close_tag, preserve = open_parents.pop()
+                write(close_tag)
+            kind = kinds[node]
+            if kind in PARENT_KINDS:
+                write(OPEN_TAGS[kind])
+                open_parents.append((subtree_ends[node], CLOSE_TAGS[kind], preserve))
+                preserve = preserve or kind in PRESERVE_KINDS
+                continue
+            value = text[starts[node] : ends[node]]
+            if minify and not preserve and kind not in PRESERVE_KINDS:
+                value = WHITESPACE_PATTERN.sub(" ", value)
+            if kind == 0:
+                write(value)
+            elif kind == IMAGE:
+                write(self.open_tag(text, node))
+            elif kind == LINK:
+                write(self.open_tag(text, node) + value + "</a>")
+            else:
+                write(OPEN_TAGS[kind] + value + CLOSE_TAGS[kind])
+        while open_parents:
+            write(open_parents.pop()[1])
+
+    def render_pretty(self, text, index, write, indent) -> None:
+        kind = self.kinds[index]
+        end = self.subtree_ends[index]
+        has_block_child = False
+        if kind in BLOCK_KINDS and kind in PARENT_KINDS and kind not in PRESERVE_KINDS:
+            child = index + 1
+            while child < end:
+                if self.kinds[child] in BLOCK_KINDS:
+                    has_block_child = True
+                    break
+                child = self.subtree_ends[child]
+        if not has_block_child:
+            # Inline and whitespace-sensitive elements are kept on one line
+            if kind in BLOCK_KINDS:
+                write(indent)
+            self.render_compact(text, index, write, False, False)
+            return
+        write(indent + OPEN_TAGS[kind])
+        child_indent = indent + INDENT
+        in_inline_run = False
+        child = index + 1
+        while child < end:
+            if self.kinds[child] in BLOCK_KINDS:
+                write("\n")
+                self.render_pretty(text, child, write, child_indent)
+                in_inline_run = False
+            else:
+                if not in_inline_run:
+                    # Consecutive inline children share one line
+                    write("\n" + child_indent)
+                    in_inline_run = True
+                self.render_compact(text, child, write, False, False)
+            child = self.subtree_ends[child]
+        write("\n" + indent + CLOSE_TAGS[kind])
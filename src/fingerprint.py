@@ -0,0 +1,128 @@
+import posixpath
+import re
+
+# Assets safe to serve under a content-hashed name; anything browsers or
+# crawlers request by a fixed name (favicon.ico, robots.txt) keeps its own
+FINGERPRINT_EXTENSIONS = (
+    ".css", ".js", ".mjs", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp",
+    ".avif", ".woff", ".woff2", ".ttf", ".otf", ".mp3", ".mp4", ".webm",
+)
+FINGERPRINT_LENGTH = 10
+# An attribute name right before the '=' matched by reference_pattern
+REFERENCE_ATTRIBUTE_PATTERN = re.compile(r"\s(?:href|src)\s*$", re.IGNORECASE)
+CSS_URL_PATTERN = re.compile(r"""(url\(\s*)(["']?)([^"')\s]+)\2""", re.IGNORECASE)
+
+
+def fingerprint_path(rel_path: str, digest: str) -> str:
+    """Insert the start of a content digest before the extension."""
+    root, extension = posixpath.splitext(rel_path)
+    return f"{root}.{digest[:FINGERPRINT_LENGTH]}{extension}"
+
+
+def fingerprinted_url(url: str, assets: dict, base: str) -> str:
+    """Point url at the fingerprinted name of the asset it references.
+
+    assets maps asset paths (relative to the site root, '/' separated) to
+    their fingerprinted paths, and base is the directory relative urls are
+    resolved against. Urls naming anything else are returned unchanged.
+    """
+    end = len(url)
+    for char in "?#":
+        if char in url:
+            end = min(end, url.index(char))
+    path, suffix = url[:end], url[end:]
+    if not path or path.startswith("//") or ":" in path.split("/", 1)[0]:
+        # Empty, fragment only, or on another host or scheme
+        return url
+    if path.startswith("/"):
+        key = posixpath.normpath(path[1:])
+    else:
+        key = posixpath.normpath(posixpath.join(base, path))
+    name = assets.get(key)
+    if name is None:
+        return url
+    # Only the file name changes, so the url keeps its own form
+    return path[: path.rfind("/") + 1] + posixpath.basename(name) + suffix
+
+
+def reference_pattern(assets: dict) -> re.Pattern:
+    """Match quoted attribute values that end in an asset's file name.
+
+    Only those can need rewriting. Matching starts at the '=' of each
+    attribute, a literal the regex engine can skip ahead to, which keeps
+    this fast on large pages; whether the attribute is an href or src is
+    checked for the few matches.
+    """
+    names = sorted({posixpath.basename(path) for path in assets}, key=len)
+    alternatives = "|".join(re.escape(name) for name in reversed(names))
+    return re.compile(
+        rf"""=(\s*)(["'])((?:[^"'\s]*/)?(?:{alternatives})(?:[?#][^"']*)?)\2"""
+    )
+
+
+def rewrite_references(
+    html: str, assets: dict, base: str, pattern: re.Pattern | None = None
+) -> str:
+    """Rewrite href and src attributes of html that reference assets.
+
+    pattern is reference_pattern(assets), for callers that reuse it.
+    """
+    if pattern is None:
+        pattern = reference_pattern(assets)
+
+    def replace(match):
+        start = match.start()
+        attribute = REFERENCE_ATTRIBUTE_PATTERN.search(html, max(start - 8, 0), start)
+        if attribute is None:
+            return match[0]
+        url = fingerprinted_url(match[3], assets, base)
+        return f"={match[1]}{match[2]}{url}{match[2]}"
+
+    return pattern.sub(replace, html)
+
+
+def rewrite_css_urls(css: str, assets: dict, base: str) -> str:
+    """Rewrite the url() references of a stylesheet that reference assets."""
+    return CSS_URL_PATTERN.sub(
+        lambda match: match[1]
+        + match[2]
+        + fingerprinted_url(match[3], assets, base)
+        + match[2],
+        css,
+    )
+
+
+class ReferenceRewriter:
+    """Rewrites asset references in html written through it.
+
+    Chunks are rewritten in batches of about batch_chars, a pass of pattern
+    (see reference_pattern) each, rather than one by one. Tags must be
+    written whole, as every renderer does, so that no reference is split
+    between batches. Call flush() once done.
+    """
+
+    def __init__(
+        self, write, assets: dict, base: str, pattern: re.Pattern, batch_chars=1 << 16
+    ) -> None:
+        self.page_write = write
+        self.assets = assets
+        self.base = base
+        self.pattern = pattern
+        self.batch_chars = batch_chars
+        self.chunks = []
+        self.size = 0
+
+    def write(self, html: str) -> None:
+        self.chunks.append(html)
+        self.size += len(html)
+        if self.size >= self.batch_chars:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.chunks:
+            html = "".join(self.chunks)
+            self.page_write(
+                rewrite_references(html, self.assets, self.base, self.pattern)
+            )
+            self.chunks = []
+            self.size = 0
@@ -0,0 +1,20 @@
+import os
+import tempfile
+import unittest
+
+
+class TempDirTestCase(unittest.TestCase):
+    """A test case with a fresh temporary directory, self.tmp, for each test.
+
+    The directory is removed after tearDown. Subclasses overriding setUp
+    call super().setUp() first.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, path, text):
+        """Write text to path, taken as relative to self.tmp unless absolute."""
+        with open(os.path.join(self.tmp.name, path), "w") as file:
+            file.write(text)
@@ -1,26 +1,79 @@
-from typing import List
+from typing import Iterable, Iterator, List, Tuple
 from textnode import TextNode, TextType
-from htmlnode import HTMLNode, LeafNode, ParentNode
-from bs4 import BeautifulSoup, Tag
+from htmlnode import HTMLNode, LeafNode, ParentNode, INDENT, check_format
+from document import Document
+from cache import LRUCache
+from template import Template, load_template
+from profiling import NULL_TIMER
+from htmlinput import minify_html, scan_html_input
+from traverse import scan_tree
+from output import replace_if_changed
 import logging
 import os
 import re
 
+try:
+    # Only needed to validate html input with --strict-html
+    from bs4 import BeautifulSoup, Tag
+except ImportError:
+    BeautifulSoup = Tag = None
+
+# Leftmost match wins; at the same position the first alternative does
+INLINE_PATTERN = re.compile(
+    r"!\[(?P<alt>[^\[\]]*)\]\((?P<src>[^\(\)]*)\)(?P<image>)"
+    r"|\[(?P<text>[^\[\]]*)\]\((?P<href>[^\(\)]*)\)(?P<link>)"
+    r"|(?P<ticks>`+)(?P<code>[^`]+)(?P=ticks)"
+    # Bold runs to the next '**', keeping any single '*' or '`' inside as text
+    r"|\*\*(?P<bold>(?:[^*]|\*(?!\*))+)\*\*"
+    r"|\*(?P<italic>[^*]+)\*"
+)
+INLINE_TEXT_TYPES = {
+    "code": TextType.CODE,
+    "bold": TextType.BOLD,
+    "italic": TextType.ITALIC,
+}
+INLINE_TAGS = {"code": "code", "bold": "b", "italic": "i"}
+# Block types are picked from the first line of each block
+BLOCK_START_PATTERN = re.compile(
+    r"(?P<heading>#{1,6} )"
+    # A fence's info string can't hold backticks, '```x``` y' is inline code
+    r"|(?P<code>```[^`]*$)"
+    r"|(?P<quote>> )"
+    r"|(?P<unordered_list>\* )"
+    r"|(?P<ordered_list>\d+\. )"
+)
+ORDERED_ITEM_PATTERN = re.compile(r"(\d+)\. ")
+LIST_BLOCK_TYPES = ("unordered_list", "ordered_list")
+# Inline sources up to this long are cached, the repeated ones (link lists,
+# badges, references) are short while long paragraphs rarely repeat
+INLINE_CACHE_MAX_CHARS = 256
+INLINE_CACHE = LRUCache(4096)
+# Bump whenever parsing or rendering changes what a page's content looks like
+PARSER_VERSION = 3
+# Markdown this long is parsed into a flat Document rather than a node tree
+LARGE_PAGE_CHARS = 256 * 1024
+# Markdown files this big are streamed, one block (or part of one) at a time
+STREAM_PAGE_BYTES = 16 * 1024 * 1024
+# How many lines of a long list or code block are held at once when streaming
+STREAM_PART_LINES = 1024
+# Markdown this long has each of its rendered blocks memoized between builds
+BLOCK_MEMO_CHARS = 64 * 1024
+
 
 def text_node_to_html_node(text_node: TextNode) -> LeafNode:
     """Convert intermediate text node reprs to html nodes."""
     match text_node.text_type:
-        case "normal":
+        case TextType.TEXT | TextType.NORMAL:
             return LeafNode(None, text_node.text)
-        case "bold":
+        case TextType.BOLD:
             return LeafNode("b", text_node.text)
-        case "italic":
+        case TextType.ITALIC:
             return LeafNode("i", text_node.text)
-        case "code":
+        case TextType.CODE:
             return LeafNode("code", text_node.text)
-        case "link":
+        case TextType.LINK:
             return LeafNode("a", text_node.text, props={"href": text_node.url})
-        case "image":
+        case TextType.IMAGE:
             return LeafNode(
                 "img",
                 value=None,
@@ -39,7 +92,7 @@ def split_nodes_delimiter(
     result_nodes = []
     for node in nodes:
         split_nodes_list = []
-        if node.text_type != "text":
+        if node.text_type != TextType.TEXT:
             # Previously delimited nodes can just be added to the result list
             result_nodes.append(node)
         else:
@@ -162,172 +215,434 @@ def split_nodes_link(nodes):
     return result_nodes
 
 
-def text_to_text_nodes(text):
-    new_nodes = [TextNode(text, TextType.TEXT)]
-    delimiter_type_map = {
-        "**": TextType.BOLD,
-        "*": TextType.ITALIC,
-        "`": TextType.CODE,
-    }
-    for delimiter, text_type in delimiter_type_map.items():
-        new_nodes = split_nodes_delimiter(new_nodes, delimiter, text_type)
-    new_nodes = split_nodes_image(new_nodes)
-    new_nodes = split_nodes_link(new_nodes)
-    return new_nodes
+def text_to_text_nodes(text: str) -> List[TextNode]:
+    """Tokenize inline markdown in a single left-to-right scan.
+
+    Unlike chaining split_nodes_delimiter, split_nodes_image and
+    split_nodes_link, every span is visited once and any number of links
+    and images per span are found.
+    """
+    result_nodes = []
+    position = 0
+    for match in INLINE_PATTERN.finditer(text):
+        if match.start() > position:
+            result_nodes.append(plain_text_node(text[position : match.start()]))
+        kind = match.lastgroup
+        if kind == "image":
+            result_nodes.append(
+                TextNode(match.group("alt"), TextType.IMAGE, match.group("src"))
+            )
+        elif kind == "link":
+            result_nodes.append(
+                TextNode(match.group("text"), TextType.LINK, match.group("href"))
+            )
+        else:
+            result_nodes.append(TextNode(match.group(kind), INLINE_TEXT_TYPES[kind]))
+        position = match.end()
+    if position < len(text):
+        result_nodes.append(plain_text_node(text[position:]))
+    return result_nodes
 
 
-def markdown_to_blocks(markdown: str) -> List[str]:
-    markdown_lines = markdown.split("\n")
-    markdown_lines = [line.strip() for line in markdown_lines]
-    result, block_text = [], []
-    in_multiline_block = False
-    for index, line in enumerate(markdown_lines):
-        if line and not in_multiline_block and not markdown_lines[index + 1]:
-            # Case: isolated line of text followed by empty line
-            result.append(line)
-        elif line and in_multiline_block and index == len(markdown_lines) - 1:
-            # Case: last line of block ends the markdown text
-            block_text.append(line)
-            result.append("\n".join(block_text))
-            block_text = []
-            in_multiline_block = False
-        elif line and not in_multiline_block and markdown_lines[index + 1]:
-            # Case: first line of a multiline block
-            block_text.append(line)
-            in_multiline_block = True
-        elif line and in_multiline_block and markdown_lines[index + 1]:
-            # Case: line within the first and last lines of a block
-            block_text.append(line)
-        elif line and in_multiline_block and not markdown_lines[index + 1]:
-            # Case: last line of a multiline block
-            block_text.append(line)
-            result.append("\n".join(block_text))
-            block_text = []  # Clear the block_text list for any new blocks
-            in_multiline_block = False
-        elif not line:
-            # Case: empty line between blocks and isolated lines
-            pass
+def plain_text_node(text: str) -> TextNode:
+    # Delimiters left over here are unmatched, such as '2 * 3', and kept as text
+    return TextNode(text, TextType.TEXT)
+
+
+def lex_blocks(markdown: str) -> Iterator[Tuple[str, List[str]]]:
+    """Yield (block_type, lines) for each block, classifying as it scans.
+
+    Every line is stripped and matched against BLOCK_START_PATTERN at most
+    once. Headings are always one line long, fenced code runs to its closing
+    fence (keeping blank lines and indentation), and any other block runs
+    until the next blank line. A fence that's never closed, or a numbered
+    list that doesn't count up from 1, is read as a paragraph instead.
+    """
+    for block_type, block_lines, _, _ in lex_block_parts(markdown.split("\n")):
+        yield block_type, block_lines
+
+
+def lex_block_parts(
+    lines: Iterable[str], max_lines: int | None = None
+) -> Iterator[Tuple[str, List[str], bool, bool]]:
+    """Yield (block_type, lines, first, last) for each block, see lex_blocks.
+
+    lines can be any iterable of lines without their line endings, such as
+    a file being read. With max_lines, lists and fenced code longer than
+    that come in parts of about max_lines lines; first and last say whether
+    a part opens or closes its block. Paragraphs and quotes always come
+    whole however long they are, as inline markup can span their lines.
+
+    A list or fence found not to hold up after parts of it were yielded
+    can't turn into a paragraph any more: the list ends before the line
+    that breaks its numbering, and the code runs to the end of the document.
+    """
+    yield from _lex_block_parts(lines, max_lines, True)
+
+
+def _lex_block_parts(lines, max_lines, fences):
+    """lex_block_parts, reading the first line as text unless fences is set."""
+    block_type, block_lines, first = None, [], True
+    number = 0
+    for raw_line in lines:
+        if block_type == "code":
+            if raw_line.lstrip().startswith("```"):
+                block_lines.append(raw_line.strip())
+                yield block_type, block_lines, first, True
+                block_type, block_lines, first = None, [], True
+                continue
+            block_lines.append(raw_line.rstrip("\r"))
+            if max_lines and len(block_lines) >= max_lines:
+                # Trailing blank lines wait, an unterminated fence drops them
+                keep, fence = len(block_lines), 1 if first else 0
+                while keep > fence and not block_lines[keep - 1].strip():
+                    keep -= 1
+                if keep > fence:
+                    yield block_type, block_lines[:keep], first, False
+                    block_lines, first = block_lines[keep:], False
+            continue
+        line = raw_line.strip()
+        if not line:
+            if block_type is not None:
+                yield block_type, block_lines, first, True
+                block_type, block_lines, first = None, [], True
+        elif block_type is None:
+            match = BLOCK_START_PATTERN.match(line) if fences else None
+            block_type = match.lastgroup if match else "paragraph"
+            block_lines, number = [line], 1
+            if block_type == "heading":
+                yield block_type, block_lines, True, True
+                block_type, block_lines = None, []
+            elif block_type == "ordered_list" and not is_list_item(line, 1):
+                block_type = "paragraph"
+        elif block_type == "ordered_list" and not is_list_item(line, number + 1):
+            if first:
+                block_type = "paragraph"
+                block_lines.append(line)
+            else:
+                yield block_type, block_lines, first, True
+                block_type, block_lines, first = "paragraph", [line], True
         else:
-            raise Exception(f"markdown_to_blocks error: invalid line {line}")
-    return result
+            number += 1
+            block_lines.append(line)
+            if (
+                max_lines
+                and len(block_lines) >= max_lines
+                and block_type in LIST_BLOCK_TYPES
+            ):
+                yield block_type, block_lines, first, False
+                block_lines, first = [], False
+        fences = True
+    if block_type == "code" and first:
+        # Unterminated fence, its lines are read again as ordinary blocks
+        yield from _lex_block_parts(block_lines, max_lines, False)
+        return
+    elif block_type == "code":
+        while len(block_lines) > (1 if first else 0) and not block_lines[-1].strip():
+            block_lines.pop()
+        block_lines.append("```")
+    if block_type is not None:
+        yield block_type, block_lines, first, True
+
 
+def markdown_to_blocks(markdown: str) -> List[str]:
+    return ["\n".join(block_lines) for _, block_lines in lex_blocks(markdown)]
 
-def block_to_block_type(block: List[str]) -> str:
+
+def block_to_block_type(block: str) -> str:
     "Returns a string representing an enum of the passed block's markdown type."
-    # NOTE: This code assumes well-formed markdown is passed, so it sacrifices
-    # complexity of checking every line of a block for code readability
     block_lines = block.split("\n")
-    if len(block_lines) > 1:
-        first_line, last_line = block_lines[0], block_lines[-1]
-    else:
-        first_line, last_line = block, block
-
-    if re.findall(r"^#{1,6} ", first_line):
-        # Case: 1 to 6 starting pound signs, followed by a space
-        return "heading"
-    elif re.findall(r"^```", first_line) and re.findall(r"^```", last_line):
-        # Case: ```optional_language
-        #       monospaced code
-        #       ```
-        return "code"
-    elif re.findall(r"^> ", first_line):
-        # Case: > Block of
-        #       > quoted text
-        return "quote"
-    elif re.findall(r"^\* ", first_line):
-        # Case: * A list
-        #       * of unordered items
-        return "unordered_list"
-    elif re.findall(r"^\d\. ", first_line):
-        # Case: 1. A list
-        #       2. Where each item
-        #       3. Has a numbered order
-        for index, line in enumerate(block_lines):
-            num = int(re.findall(r"^\d\. ", line)[0][0])  # Turn match: "1. " into int 1
-            if (index == 0 and num != 1) or (index != num - 1):
-                raise ValueError(
-                    f"block_to_block_type error: malformed line passed {line}"
-                )
-        return "ordered_list"
-    else:
+    match = BLOCK_START_PATTERN.match(block_lines[0])
+    block_type = match.lastgroup if match else "paragraph"
+    if block_type == "code" and (
+        len(block_lines) == 1 or not block_lines[-1].startswith("```")
+    ):
         return "paragraph"
+    elif block_type == "ordered_list" and not all(
+        is_list_item(line, number) for number, line in enumerate(block_lines, 1)
+    ):
+        # Not numbered 1, 2, 3..., as lex_block_parts sees it
+        return "paragraph"
+    return block_type
+
+
+def is_list_item(line: str, number: int) -> bool:
+    """Whether line is the ordered list item numbered number."""
+    match = ORDERED_ITEM_PATTERN.match(line)
+    return match is not None and int(match.group(1)) == number
+
+
+def ordered_list_items(block_lines: List[str], first_number: int = 1) -> List[str]:
+    """Strip the "1. " style markers, checking they count up from first_number."""
+    items = []
+    for index, line in enumerate(block_lines, first_number):
+        match = ORDERED_ITEM_PATTERN.match(line)
+        if match is None or int(match.group(1)) != index:
+            raise ValueError(
+                f"block_to_block_type error: malformed line passed {line}"
+            )
+        items.append(line[match.end() :])
+    return items
 
 
 def text_to_children(text: str) -> List[HTMLNode]:
+    """Build the html nodes for inline markdown, reusing INLINE_CACHE.
+
+    Cached nodes are shared between the trees they appear in, which is safe
+    as long as nodes aren't modified once built.
+    """
+    cacheable = len(text) <= INLINE_CACHE_MAX_CHARS
+    if cacheable and (children := INLINE_CACHE.get(text)) is not None:
+        return list(children)
     text_nodes = text_to_text_nodes(text)
     result = []
     for node in text_nodes:
-        if node.text_type == "text":
+        if node.text_type == TextType.TEXT:
             result.append(LeafNode(None, node.text))
         else:
             result.append(text_node_to_html_node(node))
+    if cacheable:
+        INLINE_CACHE.put(text, tuple(result))
     return result
 
 
+def block_to_html_node(block_type: str, block_lines: List[str]) -> HTMLNode:
+    """Create the html node for one block produced by lex_blocks."""
+    match block_type:
+        case "heading":
+            heading = block_lines[0]
+            num_hashtags = len(heading) - len(heading.lstrip("#"))
+            trimmed_heading = heading[num_hashtags + 1 :]
+            return LeafNode(f"h{num_hashtags}", trimmed_heading)
+        case "code":
+            middle_of_block = "\n".join(block_lines[1:-1])
+            return ParentNode("pre", [LeafNode("code", middle_of_block)])
+        case "quote":
+            trimmed_block = "\n".join([line[2:] for line in block_lines])
+            return ParentNode(
+                "blockquote", ParentNode("p", text_to_children(trimmed_block))
+            )
+        case "unordered_list":
+            list_elements = []
+            for line in block_lines:
+                trimmed_line = line[2:]  # * ^from here onward
+                list_elements.append(ParentNode("li", text_to_children(trimmed_line)))
+            return ParentNode("ul", list_elements)
+        case "ordered_list":
+            list_elements = []
+            for trimmed_line in ordered_list_items(block_lines):
+                list_elements.append(ParentNode("li", text_to_children(trimmed_line)))
+            return ParentNode("ol", list_elements)
+        case _:
+            # Treat any other block as a paragraph automatically
+            return ParentNode("p", text_to_children("\n".join(block_lines)))
+
+
 def markdown_to_html_node(markdown: str) -> ParentNode:
-    # Split markdown into blocks
-    block_list = markdown_to_blocks(markdown)
-    # Loop over blocks
-    children = []
-    for block in block_list:
-        block_type = block_to_block_type(block)
-        block_lines = block.split("\n")
-        #   Depending on type, create new HTMLNode with appropriate data
-        match block_type:
-            case "heading":
-                heading = block_lines[0]
-                hashes = heading.split(" ")[0]
-                num_hashtags = 0
-                for hashtag in hashes:
-                    num_hashtags += 1
-                trimmed_heading = heading[num_hashtags + 1 :]
-                children.append(LeafNode(f"h{num_hashtags}", trimmed_heading))
-            case "code":
-                middle_of_block = "\n".join(block_lines[1:-1])
-                children.append(ParentNode("pre", [LeafNode("code", middle_of_block)]))
-            case "quote":
-                trimmed_block = "\n".join([line[2:] for line in block_lines])
-                children.append(
-                    ParentNode(
-                        "blockquote", ParentNode("p", text_to_children(trimmed_block))
-                    )
-                )
-            case "unordered_list":
-                list_elements = []
-                for line in block_lines:
-                    trimmed_line = line[2:]  # * ^from here onward
-                    processed_nodes = text_to_children(trimmed_line)
-                    if len(processed_nodes) == 1 and isinstance(
-                        processed_nodes[0], str
-                    ):
-                        # If processed_nodes is just one string of plain text
-                        new_li = LeafNode("li", processed_nodes[0])
-                    else:
-                        new_li = ParentNode("li", processed_nodes)
-                    list_elements.append(new_li)
-                children.append(ParentNode("ul", list_elements))
-            case "ordered_list":
-                list_elements = []
-                for line in block_lines:
-                    trimmed_line = line[3:]  # 1. ^from here onward
-                    processed_nodes = text_to_children(trimmed_line)
-                    if len(processed_nodes) == 1 and isinstance(
-                        processed_nodes[0], str
-                    ):
-                        # If processed_nodes is just one string of plain text
-                        new_li = LeafNode("li", processed_nodes[0])
-                    else:
-                        new_li = ParentNode("li", processed_nodes)
-                    list_elements.append(new_li)
-                children.append(ParentNode("ol", list_elements))
-            case _:
-                # Treat any other block as a paragraph automatically
-                children.append(ParentNode("p", text_to_children(block)))
+    children = [
+        block_to_html_node(block_type, block_lines)
+        for block_type, block_lines in lex_blocks(markdown)
+    ]
     return ParentNode("div", children)
 
 
+def add_inline_nodes(document: Document, text, base, start, end) -> None:
+    """Tokenize text[start:end] like text_to_text_nodes, straight into document.
+
+    text must already be in the document's buffer at offset base.
+    """
+    position = start
+    for match in INLINE_PATTERN.finditer(text, start, end):
+        if match.start() > position:
+            add_plain_text(document, text, base, position, match.start())
+        kind = match.lastgroup
+        if kind == "image":
+            document.leaf(
+                "img",
+                base + match.start("alt"),
+                base + match.end("alt"),
+                base + match.start("src"),
+                base + match.end("src"),
+            )
+        elif kind == "link":
+            document.leaf(
+                "a",
+                base + match.start("text"),
+                base + match.end("text"),
+                base + match.start("href"),
+                base + match.end("href"),
+            )
+        else:
+            document.leaf(
+                INLINE_TAGS[kind], base + match.start(kind), base + match.end(kind)
+            )
+        position = match.end()
+    if position < end:
+        add_plain_text(document, text, base, position, end)
+
+
+def add_plain_text(document, text, base, start, end) -> None:
+    document.leaf(None, base + start, base + end)
+
+
+def markdown_to_document(markdown: str) -> Document:
+    """Parse markdown into a Document, the flat array form of the html tree.
+
+    The result renders exactly like markdown_to_html_node's tree, but
+    without allocating a Python object per element and span, which is what
+    dominates memory on very large pages.
+    """
+    document = Document()
+    root = document.open("div")
+    for block_type, block_lines in lex_blocks(markdown):
+        add_block_nodes(document, block_type, block_lines)
+    document.close(root)
+    return document
+
+
+def add_block_nodes(document: Document, block_type, block_lines) -> None:
+    """Append one block produced by lex_blocks, like block_to_html_node."""
+    match block_type:
+        case "heading":
+            heading = block_lines[0]
+            num_hashtags = len(heading) - len(heading.lstrip("#"))
+            offset = document.add_text(heading)
+            document.leaf(
+                f"h{num_hashtags}",
+                offset + num_hashtags + 1,
+                offset + len(heading),
+            )
+        case "code":
+            code = "\n".join(block_lines[1:-1])
+            offset = document.add_text(code)
+            pre = document.open("pre")
+            document.leaf("code", offset, offset + len(code))
+            document.close(pre)
+        case "quote":
+            # Rendered like the tree's blockquote, without a <p> of its own
+            text = "\n".join([line[2:] for line in block_lines])
+            offset = document.add_text(text)
+            quote = document.open("blockquote")
+            add_inline_nodes(document, text, offset, 0, len(text))
+            document.close(quote)
+        case "unordered_list" | "ordered_list":
+            if block_type == "ordered_list":
+                items = ordered_list_items(block_lines)
+                list_node = document.open("ol")
+            else:
+                items = [line[2:] for line in block_lines]
+                list_node = document.open("ul")
+            text = "\n".join(items)
+            offset = document.add_text(text)
+            start = 0
+            for item in items:
+                list_item = document.open("li")
+                add_inline_nodes(document, text, offset, start, start + len(item))
+                document.close(list_item)
+                start += len(item) + 1
+            document.close(list_node)
+        case _:
+            text = "\n".join(block_lines)
+            offset = document.add_text(text)
+            paragraph = document.open("p")
+            add_inline_nodes(document, text, offset, 0, len(text))
+            document.close(paragraph)
+
+
+def render_markdown_blocks(markdown: str, fmt: str, indent: str, memo) -> str:
+    """Render markdown like markdown_to_html_node(markdown).to_html(fmt, indent).
+
+    Each block's html is looked up in memo (a BlockMemo) by the hash of its
+    source, so only new or edited blocks are parsed and rendered.
+    """
+    check_format(fmt)
+    child_indent = indent + INDENT
+    rendered = []
+    for block_type, block_lines in lex_blocks(markdown):
+        key = memo.key(block_type, block_lines)
+        html = memo.get(key)
+        if html is None:
+            document = Document()
+            add_block_nodes(document, block_type, block_lines)
+            html = document.to_html(fmt, child_indent)
+            memo.put(key, html)
+        rendered.append(html)
+    if fmt != "pretty":
+        return "<div>" + "".join(rendered) + "</div>"
+    elif not rendered:
+        return indent + "<div></div>"
+    blocks = "".join("\n" + html for html in rendered)
+    return f"{indent}<div>{blocks}\n{indent}</div>"
+
+
+def stream_markdown(lines: Iterable[str], write, fmt="compact", indent="") -> None:
+    """Render markdown lines like markdown_to_html_node(...).render_into does.
+
+    Blocks are rendered and written as soon as they end, and long lists and
+    code blocks part by part (see lex_block_parts), so memory use grows with
+    the longest paragraph or quote rather than the length of the document.
+    """
+    check_format(fmt)
+    pretty = fmt == "pretty"
+    separator = "\n" if pretty else ""
+    child_indent = indent + INDENT
+    if not pretty:
+        indent = child_indent = ""
+    opened = False
+    for block_type, block_lines, first, last in lex_block_parts(
+        lines, STREAM_PART_LINES
+    ):
+        if not opened:
+            write(indent + "<div>")
+            opened = True
+        if block_type in LIST_BLOCK_TYPES:
+            tag = "ul" if block_type == "unordered_list" else "ol"
+            if first:
+                write(f"{separator}{child_indent}<{tag}>")
+                number = 1
+            if block_type == "ordered_list":
+                items = ordered_list_items(block_lines, number)
+                number += len(items)
+            else:
+                items = [line[2:] for line in block_lines]
+            document = Document()
+            for item in items:
+                offset = document.add_text(item)
+                list_item = document.open("li")
+                add_inline_nodes(document, item, offset, 0, len(item))
+                document.close(list_item)
+            document.render_into(write, fmt, child_indent + INDENT, separator)
+            if last:
+                write(f"{separator}{child_indent}</{tag}>")
+        elif block_type == "code":
+            # Code is written exactly as it is, whatever the format
+            if first:
+                write(f"{separator}{child_indent}<pre><code>")
+                block_lines = block_lines[1:]
+                code_started = False
+            if last:
+                block_lines = block_lines[:-1]
+            if block_lines:
+                write(("\n" if code_started else "") + "\n".join(block_lines))
+                code_started = True
+            if last:
+                write("</code></pre>")
+        else:
+            document = Document()
+            add_block_nodes(document, block_type, block_lines)
+            document.render_into(write, fmt, child_indent, separator)
+    if not opened:
+        write(indent + "<div></div>")
+    else:
+        write(f"{separator}{indent}</div>")
+
+
 def extract_title(markup, extension):
-    markup_lines = markup.split("\n")
+    return extract_title_from_lines(markup.split("\n"), extension)
+
+
+def extract_title_from_lines(markup_lines: Iterable[str], extension):
+    """Like extract_title, reading no further than the title line."""
     if extension == ".md":
         title_pattern = r"(?<=^#\s).*"
     elif extension == ".html":
@@ -342,7 +657,7 @@ def extract_title(markup, extension):
     raise EOFError("No title found in markup passed")
 
 
-def validate_html(soup: BeautifulSoup, logger: logging.Logger) -> None:
+def validate_html(soup: "BeautifulSoup", logger: logging.Logger) -> None:
     """Check if the passed html has pre-existing styles, throw error if so."""
     head = soup.find("head")
     body = soup.find("body")
@@ -366,58 +681,243 @@ def validate_html(soup: BeautifulSoup, logger: logging.Logger) -> None:
         pass
 
 
-def generate_page(markup_path, template_path, html_path, logger):
-    print(f"Making page from {markup_path} to {html_path} with {template_path}")
-    _, extension = os.path.splitext(markup_path)
-    with open(markup_path, "r") as file:
-        markup = file.read()
-    with open(template_path, "r") as file:
-        template = [line.rstrip() for line in file]
+def generate_page(
+    markup_path,
+    template_path,
+    html_path,
+    logger,
+    values=None,
+    fmt="pretty",
+    profiler=None,
+    cache=None,
+    strict_html=False,
+    output=None,
+):
+    """Render markup_path into html_path.
+
+    template_path may be a path or an already compiled Template; extra
+    placeholder values beyond Title and Content can be passed in values.
+    fmt picks the output formatting, see HTMLNode.to_html. A PageProfiler
+    passed as profiler records how long each stage of the page took. With
+    a ParseCache as cache, unchanged markup skips parsing and validation.
+    strict_html also validates html input with BeautifulSoup. Given an
+    output such as an ArchiveOutput, the page is written into that instead
+    of to disk, still named by html_path. Returns how many bytes the minify
+    format saved over compact output, 0 in other formats.
+    """
+    check_format(fmt)
+    if isinstance(template_path, Template):
+        template = template_path
+    else:
+        template = load_template(template_path)
+    print(f"Making page from {markup_path} to {html_path} with {template.sources[0]}")
+    timer = NULL_TIMER if profiler is None else profiler.start_page(markup_path)
+    try:
+        return write_page(
+            markup_path,
+            template,
+            html_path,
+            logger,
+            values,
+            fmt,
+            timer,
+            cache,
+            strict_html,
+            output,
+        )
+    finally:
+        timer.finish()
 
+
+def parse_markup(markup, extension, logger, fmt, indent, timer, strict_html):
+    """Return the page title and content, a string or a render callable."""
     # Dispatch processing based on markup extension
     if extension == ".md":
         title = extract_title(markup, extension)
-        content_html = markdown_to_html_node(markup).to_html()
+        timer.lap("title")
+        if len(markup) < LARGE_PAGE_CHARS:
+            node = markdown_to_html_node(markup)
+        else:
+            node = markdown_to_document(markup)
+        timer.lap("parse")
+        if fmt == "pretty":
+
+            def content(write):
+                write("\n")
+                node.render_into(write, fmt, indent + INDENT)
+                write("\n" + indent)
+
+        else:
+
+            def content(write):
+                node.render_into(write, fmt)
+
     elif extension == ".html":
-        soup = BeautifulSoup(markup, "html.parser")
-        validate_html(soup, logger)  # raise error if pre-existing styles found
-        title = soup.title.get_text()
-        content_html = str(soup.body.encode_contents(), "utf-8")
+        # raise error if pre-existing styles found
+        title, content = scan_html_input(markup, logger)
+        timer.lap("parse")
+        if strict_html:
+            if BeautifulSoup is None:
+                raise ValueError("Strict html validation needs beautifulsoup4")
+            validate_html(BeautifulSoup(markup, "html.parser"), logger)
+            timer.lap("validate")
     else:
         raise ValueError("Unhandled markup case")
+    return title, content
+
+
+def write_page(
+    markup_path,
+    template,
+    html_path,
+    logger,
+    values,
+    fmt,
+    timer,
+    cache,
+    strict_html,
+    output=None,
+):
+    _, extension = os.path.splitext(markup_path)
+    # Pretty content is indented one level past the line holding its slot
+    indent = template.indents.get("Content", "") if fmt == "pretty" else ""
+    saved_bytes = template.minified().saved_bytes if fmt == "minify" else 0
+    if extension == ".md" and os.path.getsize(markup_path) >= STREAM_PAGE_BYTES:
+        # Too big to hold, or to cache, in one piece
+        stream_page(
+            markup_path, template, html_path, values, fmt, indent, timer, output
+        )
+        return saved_bytes
+    with open(markup_path, "r") as file:
+        markup = file.read()
+    timer.lap("read")
 
-    html = []
-    for line in template:
-        if match := re.findall(r"{{ Title }}", line):
-            line = line.replace(match[0], title)
-            html.append(line)
-        elif match := re.findall(r"{{ Content }}", line):
-            line = line.replace(match[0], content_html)
-            html.append(line)
-        else:
-            html.append(line)
-    formatted_html = BeautifulSoup("\n".join(html), "html.parser").prettify(
-        formatter="html5"
-    )
-
-    if os.path.exists(os.path.dirname(html_path)):
-        with open(html_path, "w") as file:
-            for line in formatted_html:
-                file.write(line)
-
-
-def generate_page_recursive(content_path, template_path, dest_path, logger):
-    for item in os.listdir(content_path):
-        item_path = os.path.join(content_path, item)
-        if os.path.isfile(item_path):
-            item_html = os.path.splitext(item)[0] + ".html"
-            generate_page(
-                item_path, template_path, os.path.join(dest_path, item_html), logger
-            )
-        elif not os.path.isdir(item_path):
-            raise Exception(f"Item {item} is neither file nor directory.")
-        else:
-            # Must be a directory in this case
-            new_dest_dir = os.path.join(dest_path, item)
-            os.mkdir(new_dest_dir)
-            generate_page_recursive(item_path, template_path, new_dest_dir, logger)
+    cached = None
+    if cache is not None:
+        cache_key = cache.key(
+            markup, PARSER_VERSION, extension, fmt, indent, strict_html
+        )
+        cached = cache.get(cache_key)
+    if cached is not None:
+        title, content = cached
+        timer.lap("cache")
+    elif cache is not None and extension == ".md" and len(markup) >= BLOCK_MEMO_CHARS:
+        title = extract_title(markup, extension)
+        timer.lap("title")
+        memo = cache.block_memo(markup_path, PARSER_VERSION, fmt, indent)
+        content = render_markdown_blocks(markup, fmt, indent + INDENT, memo)
+        if fmt == "pretty":
+            content = "\n" + content + "\n" + indent
+        logger.debug(f"Rendered {markup_path} reusing blocks: {memo}")
+        timer.lap("parse")
+        memo.save()
+        cache.put(cache_key, title, content)
+        timer.lap("cache")
+    else:
+        title, content = parse_markup(
+            markup, extension, logger, fmt, indent, timer, strict_html
+        )
+        if cache is not None:
+            if callable(content):
+                chunks = []
+                content(chunks.append)
+                content = "".join(chunks)
+            cache.put(cache_key, title, content)
+            timer.lap("cache")
+    if fmt == "minify" and extension == ".html":
+        minified = minify_html(content)
+        saved_bytes += len(content) - len(minified)
+        content = minified
+    render_page(template, html_path, values, fmt, title, content, timer, output)
+    return saved_bytes
+
+
+def stream_page(
+    markup_path, template, html_path, values, fmt, indent, timer, output=None
+):
+    """Write a markdown page while reading it, a block at a time."""
+    with open(markup_path, "r") as file:
+        title = extract_title_from_lines(file, ".md")
+    timer.lap("title")
+
+    def content(write):
+        with open(markup_path, "r") as file:
+            lines = (line.rstrip("\n") for line in file)
+            if fmt == "pretty":
+                write("\n")
+                stream_markdown(lines, write, fmt, indent + INDENT)
+                write("\n" + indent)
+            else:
+                stream_markdown(lines, write, fmt)
+
+    render_page(template, html_path, values, fmt, title, content, timer, output)
+
+
+def render_page(template, html_path, values, fmt, title, content, timer, output=None):
+    if fmt == "minify":
+        template = template.minified()
+    values = {**(values or {}), "Title": title, "Content": content}
+
+    if output is not None:
+        with output.open(html_path, "w") as file:
+            template.render_into(file.write, values, html_path)
+    elif os.path.exists(os.path.dirname(html_path)):
+        # Stream the page straight to disk, dropping partial output on errors.
+        # An existing page is only replaced if its html changed.
+        exists = os.path.exists(html_path)
+        out_path = f"{html_path}.{os.getpid()}.tmp" if exists else html_path
+        try:
+            with open(out_path, "w") as file:
+                template.render_into(file.write, values, html_path)
+        except Exception:
+            os.remove(out_path)
+            raise
+        if exists:
+            replace_if_changed(out_path, html_path)
+    # Rendering, templating and writing are one streamed stage
+    timer.lap("render")
+
+
+def page_output_path(markup_path, content_path, dest_path):
+    """Return where the page generated from markup_path is written."""
+    rel_path = os.path.relpath(markup_path, content_path)
+    return os.path.join(dest_path, os.path.splitext(rel_path)[0] + ".html")
+
+
+def plan_pages(content_path, dest_path):
+    """Return sorted (markup_path, html_path) pairs for every content file.
+
+    Files come in scan_tree order: each directory's files by name, then its
+    subdirectories by name.
+    """
+    if not os.path.isdir(content_path):
+        return []
+    return [
+        (
+            os.path.join(content_path, rel_path),
+            os.path.join(dest_path, os.path.splitext(rel_path)[0] + ".html"),
+        )
+        for rel_path, _ in scan_tree(content_path)
+    ]
+
+
+def output_conflicts(outputs: dict) -> dict:
+    """Find the sources that generate the same output as another source.
+
+    outputs maps each source to the output generated from it, such as
+    x.md and x.html both to x.html. Returns an error message for every
+    source in such a clash: the output of either would depend on which was
+    written last, so neither is built.
+    """
+    claimed = {}
+    for source, output in outputs.items():
+        claimed.setdefault(output, []).append(source)
+    conflicts = {}
+    for output, sources in claimed.items():
+        if len(sources) > 1:
+            for source in sources:
+                others = ", ".join(other for other in sources if other != source)
+                conflicts[source] = (
+                    f"ValueError: {output} is also generated from {others}"
+                )
+    return conflicts
@@ -0,0 +1,132 @@
+import logging
+import re
+from html.parser import HTMLParser
+from htmlnode import WHITESPACE_PATTERN
+from template import LAYOUT_WHITESPACE_PATTERN
+
+# Content ends at the last of these after the body start tag
+CONTENT_END_PATTERNS = (
+    re.compile(r"</body\s*>", re.IGNORECASE),
+    re.compile(r"</html\s*>", re.IGNORECASE),
+)
+# Elements whose whitespace matters, left as written when minifying
+PRESERVED_HTML_PATTERN = re.compile(
+    r"<(pre|textarea|script|style|code)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL
+)
+
+
+class BodyReached(Exception):
+    """Stops the scan once the head is done with, see HeadScanner."""
+
+
+class HeadScanner(HTMLParser):
+    """Collect what Sidewinder needs from an html page's head, then stop.
+
+    Records the page title, whether the head links a stylesheet, and the
+    offset just past the <body> start tag. Nothing past that tag is
+    tokenized; feed() raises BodyReached as soon as it is seen.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.title = None
+        self.title_parts = None
+        self.seen_head = False
+        self.in_head = False
+        self.stylesheet = False
+        self.body_position = None  # (line, column) where the body tag ends
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "head":
+            self.seen_head = self.in_head = True
+        elif tag == "title" and self.title is None:
+            self.title_parts = []
+        elif tag == "link" and self.in_head:
+            rel = dict(attrs).get("rel") or ""
+            if "stylesheet" in rel.lower().split():
+                self.stylesheet = True
+        elif tag == "body":
+            line, column = self.getpos()
+            self.body_position = line, column + len(self.get_starttag_text())
+            raise BodyReached()
+
+    def handle_endtag(self, tag):
+        if tag == "head":
+            self.in_head = False
+        elif tag == "title" and self.title_parts is not None:
+            self.title = "".join(self.title_parts)
+            self.title_parts = None
+
+    def handle_data(self, data):
+        if self.title_parts is not None:
+            self.title_parts.append(data)
+
+
+def line_offset(text: str, line: int) -> int:
+    """Return the offset where the 1-based line of text starts."""
+    offset = 0
+    for _ in range(line - 1):
+        offset = text.index("\n", offset) + 1
+    return offset
+
+
+def scan_html_input(markup: str, logger: logging.Logger) -> tuple:
+    """Return the title and raw body contents of an html content file.
+
+    Raises ValueError for the same problems validate_html rejects: a
+    missing title, head or body, or a stylesheet linked from the head.
+    The body contents are sliced out of markup as written, up to the last
+    </body> (or </html>, or the end of the file).
+    """
+    scanner = HeadScanner()
+    try:
+        scanner.feed(markup)
+        scanner.close()
+    except BodyReached:
+        pass
+    title = scanner.title
+    if title is None and scanner.title_parts is not None:
+        # An unclosed title runs up to the body, as browsers read it
+        title = "".join(scanner.title_parts)
+    if title is None:
+        logger.error(f"No title found in html: {markup[:200]}")
+        raise ValueError("No title found in html!")
+    elif not scanner.seen_head:
+        logger.error(f"No head found in html: {title}")
+        raise ValueError("No head found in html!")
+    elif scanner.body_position is None:
+        logger.error(f"No body found in html: {title}")
+        raise ValueError("No body found in html!")
+    elif scanner.stylesheet:
+        logger.error(f"Pre-existing styles found in html: {title}")
+        raise ValueError(
+            "Styles not supported in Sidewinder input! Did you put something from 'public' into the 'content' folder?"
+        )
+    line, column = scanner.body_position
+    start = line_offset(markup, line) + column
+    end = len(markup)
+    for pattern in CONTENT_END_PATTERNS:
+        matches = list(pattern.finditer(markup, start))
+        if matches:
+            end = matches[-1].start()
+            break
+    return title, markup[start:end]
+
+
+def collapse_whitespace(html: str) -> str:
+    html = LAYOUT_WHITESPACE_PATTERN.sub(r"\1\2", html)
+    return WHITESPACE_PATTERN.sub(" ", html)
+
+
+def minify_html(html: str) -> str:
+    """Return raw html with layout whitespace dropped and the rest collapsed.
+
+    pre, textarea, script, style and code elements are copied as written.
+    """
+    parts, position = [], 0
+    for match in PRESERVED_HTML_PATTERN.finditer(html):
+        parts.append(collapse_whitespace(html[position : match.start()]))
+        parts.append(match[0])
+        position = match.end()
+    parts.append(collapse_whitespace(html[position:]))
+    return "".join(parts)
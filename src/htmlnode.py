@@ -1,4 +1,37 @@
+import re
+
+FORMATS = ("compact", "pretty", "minify")
+INDENT = "  "
+# Elements that never have content or a closing tag
+VOID_TAGS = frozenset(
+    (
+        "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+        "source", "track", "wbr",
+    )
+)
+# Elements that get their own line when pretty printing
+BLOCK_TAGS = frozenset(
+    (
+        "address", "article", "aside", "blockquote", "body", "div", "footer", "h1",
+        "h2", "h3", "h4", "h5", "h6", "head", "header", "hr", "html", "li", "main",
+        "nav", "ol", "p", "pre", "section", "table", "tbody", "td", "th", "thead",
+        "tr", "ul",
+    )
+)
+# Elements whose text must come out exactly as written
+PRESERVE_TAGS = frozenset(("pre", "code", "textarea", "script", "style"))
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def check_format(fmt):
+    if fmt not in FORMATS:
+        raise ValueError(f"Invalid output format: {fmt}, expected one of {FORMATS}")
+
+
 class HTMLNode:
+    # Documents allocate a node per element and text run, so skip __dict__
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None) -> None:
         self.tag = tag
         self.value = value
@@ -8,63 +41,107 @@ class HTMLNode:
     def __repr__(self) -> str:
         return f"HTMLNode(\n\t<{self.tag}>,\n\t{self.value},\n\tchildren: {self.children},\n\tprops: {self.props}\n)"
 
-    def to_html(self):
+    def to_html(self, fmt="compact", indent=""):
+        """Serialize the node to a string, see render_into for the formats."""
+        chunks = []
+        self.render_into(chunks.append, fmt, indent)
+        return "".join(chunks)
+
+    def render_into(self, write, fmt="compact", indent=""):
+        """Serialize the node in one pass, passing each fragment to write.
+
+        compact renders the tree exactly as built, pretty puts block elements
+        on their own indented lines (starting at indent) and minify also
+        collapses whitespace runs in text outside of <pre> and <code>.
+        """
+        check_format(fmt)
+        if fmt == "pretty":
+            self.render_pretty(write, indent)
+        else:
+            self.render_compact(write, minify=fmt == "minify")
+
+    def render_compact(self, write, minify=False, preserve=False):
         raise NotImplementedError("Raw HTMLNode found: ", self.tag)
 
+    def render_pretty(self, write, indent):
+        if self.tag in BLOCK_TAGS:
+            write(indent)
+        self.render_compact(write)
+
     def props_to_html(self):
-        props_repr = ""
-        for key, val in self.props.items():
-            props_repr += f' {key}="{val}"'  # leading space is important!
-        return props_repr
+        # leading space is important!
+        return "".join([f' {key}="{val}"' for key, val in self.props.items()])
+
+    def open_tag(self):
+        if self.props:
+            return f"<{self.tag}{self.props_to_html()}>"
+        return f"<{self.tag}>"
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None) -> None:
-        super().__init__(tag, value, children=None, props=props)
+        self.tag = tag
+        self.value = value
+        self.children = None
+        self.props = props
 
-    def to_html(self):
+    def render_compact(self, write, minify=False, preserve=False):
+        value = "" if self.value is None else f"{self.value}"
+        if minify and not preserve and self.tag not in PRESERVE_TAGS:
+            value = WHITESPACE_PATTERN.sub(" ", value)
         if self.tag is None:
-            return f"{self.value}"
-        elif self.props is None:
-            return f"<{self.tag}>{self.value}</{self.tag}>"
+            write(value)
+        elif self.tag in VOID_TAGS:
+            write(self.open_tag())
         else:
-            props_text = ""
-            for key, val in self.props.items():
-                props_text += f'{key}="{val}" '
-            return f"<{self.tag} {props_text}>{self.value}</{self.tag}>"
+            write(f"{self.open_tag()}{value}</{self.tag}>")
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag=None, children=None, props=None) -> None:
-        super().__init__(tag, value=None, children=children, props=props)
-        if self.tag is None:
+        if tag is None:
             raise ValueError("ParentNode 'tag' field cannot be None")
-        elif self.children is None:
+        elif children is None:
             raise ValueError("ParentNode 'children' field must contain a list")
-        else:
-            pass
+        self.tag = tag
+        self.value = None
+        self.children = children
+        self.props = props
 
     def __iter__(self):
-        self.index = 0
-        return self
-
-    def __next__(self):
-        if self.index >= len(self.children):
-            raise StopIteration
-        child_node = self.children[self.index]
-        self.index += 1
-        return child_node
-
-    def to_html(self):
-        parent_close_tag = f"</{self.tag}>"
-        if self.props:
-            props_text = ""
-            for key, val in self.props.items():
-                props_text += f'{key}="{val}" '
-                parent_open_tag = f"<{self.tag} {props_text}>"
-        else:
-            parent_open_tag = f"<{self.tag}>"
-        inner_html = ""
-        for leaf in self.children:
-            inner_html += leaf.to_html()
-        return parent_open_tag + inner_html + parent_close_tag
+        # A fresh iterator each time, so nested or concurrent loops don't clash
+        return iter(self.children)
+
+    def render_compact(self, write, minify=False, preserve=False):
+        preserve = preserve or self.tag in PRESERVE_TAGS
+        write(self.open_tag())
+        for child in self.children:
+            child.render_compact(write, minify, preserve)
+        write(f"</{self.tag}>")
+
+    def render_pretty(self, write, indent):
+        if self.tag not in BLOCK_TAGS or self.tag in PRESERVE_TAGS:
+            # Inline and whitespace-sensitive elements are kept on one line
+            return super().render_pretty(write, indent)
+        children = list(self.children)
+        if not any(child.tag in BLOCK_TAGS for child in children):
+            return super().render_pretty(write, indent)
+        write(indent + self.open_tag())
+        child_indent = indent + INDENT
+        in_inline_run = False
+        for child in children:
+            if child.tag in BLOCK_TAGS:
+                write("\n")
+                child.render_pretty(write, child_indent)
+                in_inline_run = False
+            else:
+                if not in_inline_run:
+                    # Consecutive inline children share one line
+                    write("\n" + child_indent)
+                    in_inline_run = True
+                child.render_compact(write)
+        write(f"\n{indent}</{self.tag}>")
@@ -1,26 +1,145 @@
+import argparse
 import os
-import shutil
 import logging
-from functions import generate_page_recursive
+from htmlnode import FORMATS
+from project import Project
+from profiling import PageProfiler
+from cache import PARSE_CACHE_BYTES
+from functions import INLINE_CACHE, BeautifulSoup
+from serve import serve, watch
+from daemon import serve_daemon
 
 logger = logging.getLogger(__name__)
 
 
-def cp_recursive(source, destination):
-    for item in os.listdir(source):
-        item_absolute = os.path.join(source, item)
-        logging.info(f"item in os.listdir({source}): {item}")
-        if os.path.isfile(item_absolute):
-            logging.info("Item is file")
-            shutil.copy(item_absolute, destination)
-        else:
-            logging.info("Item is not file, making new dir in destination")
-            new_destination = os.path.join(destination, item)
-            os.mkdir(new_destination)
-            cp_recursive(item_absolute, new_destination)
+def non_negative_int(value: str) -> int:
+    """An argparse type for counts and sizes, where 0 has its own meaning."""
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 or more, not {number}")
+    return number
 
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="sidewinder", description="Build the site in 'content' into 'public'."
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="keep 'public' and only regenerate pages whose sources changed",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=non_negative_int,
+        default=1,
+        help="number of worker processes generating pages (0: one per core)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="pretty",
+        help="how generated html is laid out (default: pretty)",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="same as --format minify, which also minifies copied css files",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="publish css, js, images and fonts under content-hashed names",
+    )
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="compare static files by content hash rather than size and mtime",
+    )
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="also write a .gz of each html, css, js, svg and json output",
+    )
+    parser.add_argument(
+        "--archive",
+        metavar="PATH",
+        help="build into a .tar.gz or .zip at PATH instead of 'public'",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="rebuild affected pages whenever content, static or the template change",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="watch, and serve 'public' with automatic browser reloads",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="keep running and build on requests from client.py",
+    )
+    parser.add_argument(
+        "--port", type=int, default=8080, help="port for --serve (default: 8080)"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="time each stage of each page and print the slowest pages",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="with --profile, also record each stage's peak memory (slower)",
+    )
+    parser.add_argument(
+        "--profile-slowest",
+        type=non_negative_int,
+        default=0,
+        metavar="N",
+        help="with --profile, save cProfile stats of the N slowest pages",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=non_negative_int,
+        default=PARSE_CACHE_BYTES >> 20,
+        metavar="MIB",
+        help="size cap of the parsed content cache in MiB (0: no cache)",
+    )
+    parser.add_argument(
+        "--strict-html",
+        action="store_true",
+        help="also validate html content files with BeautifulSoup (needs bs4)",
+    )
+    return parser.parse_args(argv)
+
+
+def report_profile(profiler: PageProfiler, project: Project) -> None:
+    print(profiler.report())
+    if INLINE_CACHE.hits or INLINE_CACHE.misses:
+        # Only pages generated in this process count, as with --jobs 1
+        print(f"Inline cache: {INLINE_CACHE.stats()}")
+    if profiler.slowest:
+        directory = os.path.join(project.cache_dir, "profiles")
+        paths = profiler.dump_profiles(directory)
+        print(f"Saved {len(paths)} cProfile dump(s) to {directory}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.minify:
+        args.format = "minify"
+    keep_running = args.watch or args.serve or args.daemon
+    if args.archive and (keep_running or args.incremental or args.gzip):
+        raise SystemExit(
+            "--archive builds from scratch without 'public', so it can't be "
+            "combined with --incremental, --gzip, --watch, --serve or --daemon"
+        )
+    if args.strict_html and BeautifulSoup is None:
+        raise SystemExit("--strict-html needs beautifulsoup4, see requirements.txt")
     logging.basicConfig(filename="sidewinder.log.txt", level=logging.INFO)
     cwd = os.getcwd()
     if os.path.basename(cwd) == "src":
@@ -28,22 +147,57 @@ def main():
         root = os.getcwd()
     else:
         root = os.getcwd()
-    static = os.path.join(root, "static")
-    public = os.path.join(root, "public")
-    content = os.path.join(root, "content")
-    logger.info(f"cwd: {cwd}\nroot: {root}\nstatic: {static}\npublic {public}")
-    if os.path.exists(public):
-        # Delete any pre-existing /public/ dir
-        logger.info("Pre-existing 'public' dir found, deleting recursively...")
-        shutil.rmtree(public)
-    os.mkdir(public)
-
-    # Recursively copy all of /static/ into /public/
-    cp_recursive(static, public)
-
-    generate_page_recursive(
-        content, os.path.join(root, "template.html"), public, logger
+    profiler = None
+    if args.profile:
+        profiler = PageProfiler(args.profile_memory, args.profile_slowest)
+    project = Project(
+        root,
+        logger,
+        jobs=args.jobs,
+        fmt=args.format,
+        checksum=args.checksum,
+        profiler=profiler,
+        cache_bytes=args.cache_size << 20,
+        strict_html=args.strict_html,
+        gzip=args.gzip,
+        fingerprint=args.fingerprint,
     )
+    logger.info(f"cwd: {cwd}\nroot: {root}\n{project}")
+    if args.archive:
+        stats = project.build_archive(os.path.join(cwd, args.archive))
+        print(f"Wrote {stats['built']} page(s) to {args.archive}")
+    else:
+        # Watching keeps 'public' around, so it builds incrementally as well
+        stats = project.build(incremental=args.incremental or keep_running)
+        deploy = stats["deploy"]
+        print(
+            f"Since the last build: {deploy['added']} file(s) added, "
+            f"{deploy['changed']} changed, {deploy['deleted']} deleted "
+            f"(see {project.deploy_diff_path})"
+        )
+    if profiler is not None:
+        report_profile(profiler, project)
+    if args.format == "minify":
+        print(
+            f"Minifying saved {stats['saved_bytes']} bytes of html and "
+            f"{stats['static']['saved_bytes']} bytes of css"
+        )
+    if stats["failed"]:
+        message = f"{stats['failed']} page(s) failed, see the log"
+        if not keep_running:
+            raise SystemExit(message)
+        print(message)
+
+    try:
+        if args.serve:
+            serve(project, args.port)
+        elif args.watch:
+            print(f"Watching {root} for changes (Ctrl+C to stop)")
+            watch(project)
+        elif args.daemon:
+            serve_daemon(project)
+    except KeyboardInterrupt:
+        pass
 
 
 if __name__ == "__main__":
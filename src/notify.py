@@ -0,0 +1,149 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+
+# From <sys/inotify.h>
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+# wd, mask, cookie and name length, followed by the name itself
+EVENT_HEADER = struct.Struct("iIII")
+READ_BYTES = 1 << 16
+
+
+def load_libc():
+    """Return the C library if it has inotify, otherwise raise OSError."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1, libc.inotify_add_watch
+    except (OSError, AttributeError):
+        raise OSError(errno.ENOSYS, "inotify is not available")
+    return libc
+
+
+class Inotify:
+    """Reports changed paths under some directories through Linux's inotify.
+
+    Directories in trees are watched along with every directory below them,
+    including ones created later; directories in flat only for changes to
+    their own entries. Creating an Inotify raises OSError where inotify
+    isn't available. Call close() when done.
+    """
+
+    def __init__(self, trees, flat=()) -> None:
+        self.libc = load_libc()
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self.trees = [os.path.abspath(tree) for tree in trees]
+        self.watches = {}
+        for tree in self.trees:
+            self.add_tree(tree)
+        for directory in flat:
+            self.add_watch(os.path.abspath(directory))
+
+    def __repr__(self) -> str:
+        return f"Inotify({len(self.watches)} directories)"
+
+    def add_watch(self, directory: str) -> bool:
+        """Watch directory's entries; False if it doesn't exist."""
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error in (errno.ENOENT, errno.ENOTDIR):
+                return False
+            raise OSError(error, f"{os.strerror(error)}: {directory}")
+        self.watches[wd] = directory
+        return True
+
+    def add_tree(self, directory: str) -> list:
+        """Watch directory and everything below it, returning the files in it."""
+        files, stack, seen = [], [directory], set()
+        while stack:
+            path = stack.pop()
+            real_path = os.path.realpath(path)
+            if real_path in seen or not self.add_watch(path):
+                continue
+            seen.add(real_path)
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.is_dir():
+                            stack.append(entry.path)
+                        elif entry.is_file():
+                            files.append(entry.path)
+            except FileNotFoundError:
+                continue
+        return files
+
+    def in_tree(self, path: str) -> bool:
+        return any(
+            path == tree or path.startswith(tree + os.sep) for tree in self.trees
+        )
+
+    def read(self, timeout: float | None = None) -> set | None:
+        """Wait up to timeout seconds for changes, and return the paths changed.
+
+        Paths may be files or directories, changed, created or deleted.
+        Files in directories created since are reported too, as they may
+        have been written before the directory was watched. Returns None
+        if the kernel dropped events, when only a full rescan can tell.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        paths, overflowed = set(), False
+        while True:
+            try:
+                data = os.read(self.fd, READ_BYTES)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    overflowed = True
+                    continue
+                directory = self.watches.get(wd)
+                if mask & IN_IGNORED:
+                    self.watches.pop(wd, None)
+                if directory is None:
+                    continue
+                path = os.path.join(directory, name) if name else directory
+                paths.add(path)
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    if self.in_tree(path):
+                        paths.update(self.add_tree(path))
+        return None if overflowed else paths
+
+    def close(self) -> None:
+        os.close(self.fd)
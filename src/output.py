@@ -0,0 +1,258 @@
+import contextlib
+import gzip
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+import zipfile
+
+COMPARE_CHUNK_BYTES = 1 << 16
+ARCHIVE_EXTENSIONS = {".tar.gz": "tar", ".tgz": "tar", ".zip": "zip"}
+# Zip timestamps can't go back further than 1980
+ARCHIVE_DEFAULT_MTIME = 315532800
+# Entries are spooled in memory up to this size, and on disk past it
+ARCHIVE_SPOOL_BYTES = 1 << 20
+# zlib's default: level 9 takes about half as long again for ~1% less
+ARCHIVE_COMPRESSLEVEL = 6
+
+
+def same_contents(path: str, other_path: str) -> bool:
+    """Whether two files hold the same bytes; False if either is missing."""
+    try:
+        if os.path.getsize(path) != os.path.getsize(other_path):
+            return False
+        with open(path, "rb") as file, open(other_path, "rb") as other:
+            while True:
+                chunk = file.read(COMPARE_CHUNK_BYTES)
+                if chunk != other.read(COMPARE_CHUNK_BYTES):
+                    return False
+                elif not chunk:
+                    return True
+    except FileNotFoundError:
+        return False
+
+
+def replace_if_changed(tmp_path: str, path: str) -> bool:
+    """Move tmp_path over path, unless path already holds the same bytes.
+
+    An unchanged output keeps its mtime, so syncing 'public' somewhere
+    else only transfers real changes. Returns whether path was replaced.
+    """
+    if same_contents(tmp_path, path):
+        os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, path)
+    return True
+
+
+def write_if_changed(path: str, data: bytes) -> bool:
+    """Write data to path, unless path already holds exactly data."""
+    try:
+        if os.path.getsize(path) == len(data):
+            with open(path, "rb") as file:
+                if file.read() == data:
+                    return False
+    except FileNotFoundError:
+        pass
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+
+def archive_kind(path: str) -> str:
+    """Return 'tar' or 'zip', whichever the archive at path is written as."""
+    for extension, kind in ARCHIVE_EXTENSIONS.items():
+        if path.endswith(extension):
+            return kind
+    raise ValueError(f"Archives must end in one of {', '.join(ARCHIVE_EXTENSIONS)}")
+
+
+def archive_mtime() -> int:
+    """The timestamp of every archive entry: SOURCE_DATE_EPOCH, if set."""
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if not epoch:
+        return ARCHIVE_DEFAULT_MTIME
+    try:
+        return max(int(epoch), ARCHIVE_DEFAULT_MTIME)
+    except ValueError:
+        raise ValueError(f"Invalid SOURCE_DATE_EPOCH: {epoch}")
+
+
+class TextWriter:
+    """Encodes text written to it as utf-8 into a binary file.
+
+    Pages are written in many small chunks, so they're joined and encoded
+    in batches, which costs far less per write than an io.TextIOWrapper.
+    """
+
+    def __init__(self, file, batch_chars=COMPARE_CHUNK_BYTES) -> None:
+        self.file = file
+        self.batch_chars = batch_chars
+        self.chunks = []
+        self.size = 0
+
+    def write(self, text: str) -> None:
+        self.chunks.append(text)
+        self.size += len(text)
+        if self.size >= self.batch_chars:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.chunks:
+            self.file.write("".join(self.chunks).encode("utf-8"))
+            self.chunks = []
+            self.size = 0
+
+
+@contextlib.contextmanager
+def open_entry(file, mode: str):
+    """Yield file as is for mode 'wb', or a TextWriter into it for 'w'."""
+    if mode == "wb":
+        yield file
+    elif mode == "w":
+        text = TextWriter(file)
+        yield text
+        text.flush()
+    else:
+        raise ValueError(f"Unsupported mode: {mode}")
+
+
+class ArchiveOutput:
+    """Writes a site into a .tar.gz or .zip archive rather than a directory.
+
+    Files are named by their path relative to root, the directory they'd
+    otherwise be written to, and added in the order they're written. Every
+    entry gets the same timestamp (see archive_mtime), permissions and
+    owner, so the same files written in the same order always make the same
+    archive. The archive only replaces path once closed without errors.
+    """
+
+    def __init__(self, path: str, root: str, mtime: int | None = None) -> None:
+        self.path = path
+        self.root = root
+        self.kind = archive_kind(path)
+        self.mtime = archive_mtime() if mtime is None else mtime
+        self.names = set()
+        self.tmp_path = f"{path}.{os.getpid()}.tmp"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.file = open(self.tmp_path, "wb")
+        if self.kind == "zip":
+            # Entries are added as ZipInfo, which default to zlib's level
+            self.archive = zipfile.ZipFile(self.file, "w", zipfile.ZIP_DEFLATED)
+            self.gzip = None
+        else:
+            # tarfile's own gzip stream stamps the current time in its header
+            self.gzip = gzip.GzipFile(
+                "", "wb", ARCHIVE_COMPRESSLEVEL, fileobj=self.file, mtime=0
+            )
+            self.archive = tarfile.open(
+                fileobj=self.gzip, mode="w|", format=tarfile.PAX_FORMAT
+            )
+
+    def __repr__(self) -> str:
+        return f"ArchiveOutput({self.path}, {len(self.names)} file(s))"
+
+    def __enter__(self) -> "ArchiveOutput":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def entry_name(self, path: str) -> str:
+        name = os.path.relpath(path, self.root).replace(os.sep, "/")
+        if name.startswith("../") or os.path.isabs(name):
+            raise ValueError(f"{path} is outside {self.root}")
+        if name in self.names:
+            raise ValueError(f"{name} was already written to {self.path}")
+        self.names.add(name)
+        return name
+
+    def add(self, path: str, file, size: int) -> None:
+        """Add size bytes read from file as path."""
+        name = self.entry_name(path)
+        if self.kind == "zip":
+            info = zipfile.ZipInfo(name, time.gmtime(self.mtime)[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.create_system = 3
+            info.external_attr = 0o100644 << 16
+            info.file_size = size
+            with self.archive.open(info, "w") as entry:
+                shutil.copyfileobj(file, entry, COMPARE_CHUNK_BYTES)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = size
+            info.mtime = self.mtime
+            info.mode = 0o644
+            self.archive.addfile(info, file)
+
+    @contextlib.contextmanager
+    def open(self, path: str, mode: str = "wb"):
+        """Write path through a file object, in mode 'wb' or 'w' (utf-8 text).
+
+        Entries need their size up front, so the file is spooled until the
+        block ends; nothing is added if it raises.
+        """
+        with tempfile.SpooledTemporaryFile(ARCHIVE_SPOOL_BYTES) as spool:
+            with open_entry(spool, mode) as file:
+                yield file
+            size = spool.tell()
+            spool.seek(0)
+            self.add(path, spool, size)
+
+    def write(self, path: str, data: bytes) -> None:
+        self.add(path, io.BytesIO(data), len(data))
+
+    def add_file(self, path: str, source_path: str) -> None:
+        """Copy the file at source_path into the archive as path."""
+        with open(source_path, "rb") as file:
+            self.add(path, file, os.fstat(file.fileno()).st_size)
+
+    def close(self) -> None:
+        self.archive.close()
+        if self.gzip is not None:
+            self.gzip.close()
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def discard(self) -> None:
+        """Drop the unfinished archive, leaving any previous one in place."""
+        for stream in (self.archive, self.gzip):
+            # Closed for the sake of their cleanup; what they write is dropped
+            with contextlib.suppress(Exception):
+                if stream is not None:
+                    stream.close()
+        self.file.close()
+        os.remove(self.tmp_path)
+
+
+class BufferedOutput:
+    """Collects written files in memory, for another process to write out.
+
+    Worker processes can't share an ArchiveOutput, so each page they render
+    goes into one of these, which the parent copies into the archive.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self.files = []
+
+    @contextlib.contextmanager
+    def open(self, path: str, mode: str = "wb"):
+        buffer = io.BytesIO()
+        with open_entry(buffer, mode) as file:
+            yield file
+        self.files.append((path, buffer.getvalue()))
+
+    def write(self, path: str, data: bytes) -> None:
+        self.files.append((path, data))
+
+    def copy_to(self, output) -> None:
+        for path, data in self.files:
+            output.write(path, data)
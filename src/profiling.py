@@ -0,0 +1,167 @@
+import cProfile
+import heapq
+import marshal
+import os
+import time
+import tracemalloc
+
+
+class PageRecord:
+    """Wall time, and optionally peak memory, of each stage of one page."""
+
+    def __init__(self, markup_path) -> None:
+        self.markup_path = markup_path
+        self.stages = []  # (stage name, seconds, peak new bytes or None)
+        self.seconds = 0.0
+        self.profile_stats = None
+
+    def __repr__(self) -> str:
+        return f"PageRecord({self.markup_path}, {self.seconds:.6f}s, {self.stages})"
+
+
+class PageTimer:
+    """Lap timer for one page: call lap(stage) as each stage completes."""
+
+    def __init__(self, profiler, markup_path) -> None:
+        self.profiler = profiler
+        self.record = PageRecord(markup_path)
+        if profiler.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            self.reset_memory_peak()
+        self.profile = None
+        if profiler.profile_slowest:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        self.started = self.last_lap = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        peak = None
+        if self.profiler.trace_memory:
+            peak = tracemalloc.get_traced_memory()[1] - self.memory_base
+            self.reset_memory_peak()
+        self.record.stages.append((stage, now - self.last_lap, peak))
+        self.last_lap = time.perf_counter()
+
+    def reset_memory_peak(self):
+        # Peaks are reported above what was already allocated when a stage began
+        tracemalloc.reset_peak()
+        self.memory_base = tracemalloc.get_traced_memory()[0]
+
+    def finish(self):
+        self.record.seconds = time.perf_counter() - self.started
+        if self.profile is not None:
+            self.profile.disable()
+            self.profile.create_stats()
+            self.record.profile_stats = self.profile.stats
+        self.profiler.add(self.record)
+
+
+class NullTimer:
+    """Stands in for PageTimer when nobody is profiling."""
+
+    def lap(self, stage):
+        pass
+
+    def finish(self):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+class PageProfiler:
+    """Collects per-stage timings of every page generated with it.
+
+    on_stage(markup_path, stage, seconds, peak_bytes) and on_page(record)
+    are called as records arrive. With trace_memory each stage also records
+    its tracemalloc peak, and with profile_slowest=N every page is run under
+    cProfile and the profiles of the N slowest pages are kept.
+    """
+
+    def __init__(
+        self, trace_memory=False, profile_slowest=0, on_stage=None, on_page=None
+    ) -> None:
+        self.trace_memory = trace_memory
+        self.profile_slowest = profile_slowest
+        self.on_stage = on_stage
+        self.on_page = on_page
+        self.records = []
+        self.slowest = []  # min-heap of (seconds, markup_path, profile stats)
+
+    def __repr__(self) -> str:
+        return f"PageProfiler({len(self.records)} pages)"
+
+    def worker_copy(self) -> "PageProfiler":
+        """A callback-free profiler with the same settings, safe to pickle."""
+        return PageProfiler(self.trace_memory, self.profile_slowest)
+
+    def start_page(self, markup_path) -> PageTimer:
+        return PageTimer(self, markup_path)
+
+    def add(self, record: PageRecord) -> None:
+        if record.profile_stats is not None:
+            self.keep_profile(
+                (record.seconds, record.markup_path, record.profile_stats)
+            )
+            record.profile_stats = None
+        self.records.append(record)
+        if self.on_stage is not None:
+            for stage, seconds, peak in record.stages:
+                self.on_stage(record.markup_path, stage, seconds, peak)
+        if self.on_page is not None:
+            self.on_page(record)
+
+    def keep_profile(self, entry) -> None:
+        if len(self.slowest) < self.profile_slowest:
+            heapq.heappush(self.slowest, entry)
+        else:
+            heapq.heappushpop(self.slowest, entry)
+
+    def merge(self, worker: "PageProfiler") -> None:
+        """Add what a worker_copy of this profiler collected."""
+        for record in worker.records:
+            self.add(record)
+        for entry in worker.slowest:
+            self.keep_profile(entry)
+
+    def stage_totals(self) -> dict:
+        totals = {}
+        for record in self.records:
+            for stage, seconds, _ in record.stages:
+                totals[stage] = totals.get(stage, 0.0) + seconds
+        return totals
+
+    def report(self, top=10) -> str:
+        """Summarize stage totals and the slowest pages as text."""
+        lines = [f"Profiled {len(self.records)} page(s)", "Time per stage:"]
+        for stage, seconds in sorted(
+            self.stage_totals().items(), key=lambda item: -item[1]
+        ):
+            lines.append(f"  {stage:>10}: {seconds:.3f}s")
+        lines.append(f"Slowest {top} page(s):")
+        slowest = sorted(self.records, key=lambda record: -record.seconds)[:top]
+        for record in slowest:
+            stages = ", ".join(
+                f"{stage} {seconds * 1000:.1f}ms"
+                + ("" if peak is None else f" ({peak / 1024:.0f}KiB peak)")
+                for stage, seconds, peak in record.stages
+            )
+            lines.append(
+                f"  {record.seconds * 1000:8.1f}ms {record.markup_path}: {stages}"
+            )
+        return "\n".join(lines)
+
+    def dump_profiles(self, directory) -> list:
+        """Write the kept cProfile stats as .prof files readable by pstats."""
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        ranked = sorted(self.slowest, key=lambda entry: -entry[0])
+        for rank, (_, markup_path, stats) in enumerate(ranked, 1):
+            name = os.path.splitext(os.path.basename(markup_path))[0]
+            path = os.path.join(directory, f"{rank:02d}-{name}.prof")
+            with open(path, "wb") as file:
+                marshal.dump(stats, file)
+            paths.append(path)
+        return paths
@@ -0,0 +1,271 @@
+import logging
+import os
+from assets import copy_static, load_assets, load_static_manifest, sync_static
+from build import build_incremental, generate_pages, load_manifest, remove_output
+from functions import output_conflicts, plan_pages
+from output import ArchiveOutput
+from template import load_template
+from profiling import PageProfiler
+from cache import PARSE_CACHE_BYTES, ParseCache
+from compress import load_compressed, precompress, remove_compressed
+from deploy import write_deploy_manifest
+from traverse import scan_files
+
+
+def is_within(path: str, directory: str) -> bool:
+    return os.path.commonpath([path, directory]) == directory
+
+
+class Project:
+    """A Sidewinder project root: its paths, build options and build steps."""
+
+    def __init__(
+        self,
+        root,
+        logger: logging.Logger,
+        jobs=1,
+        fmt="pretty",
+        checksum=False,
+        profiler: PageProfiler | None = None,
+        cache_bytes=PARSE_CACHE_BYTES,
+        strict_html=False,
+        gzip=False,
+        fingerprint=False,
+    ) -> None:
+        self.root = os.path.abspath(root)
+        self.logger = logger
+        self.jobs = jobs
+        self.fmt = fmt
+        self.checksum = checksum
+        self.profiler = profiler
+        self.strict_html = strict_html
+        self.gzip = gzip
+        self.fingerprint = fingerprint
+        self.static = os.path.join(self.root, "static")
+        self.public = os.path.join(self.root, "public")
+        self.content = os.path.join(self.root, "content")
+        self.template_path = os.path.join(self.root, "template.html")
+        self.cache_dir = os.path.join(self.root, ".sidewinder")
+        self.manifest_path = os.path.join(self.cache_dir, "manifest.json")
+        self.static_manifest_path = os.path.join(self.cache_dir, "static.json")
+        self.gzip_manifest_path = os.path.join(self.cache_dir, "gzip.json")
+        # Maps static assets to their fingerprinted names, see sync_static
+        self.asset_manifest_path = os.path.join(self.cache_dir, "assets.json")
+        # What 'public' holds after each build, and what changed, for deploys
+        self.deploy_manifest_path = os.path.join(self.cache_dir, "deploy.json")
+        self.deploy_diff_path = os.path.join(self.cache_dir, "deploy-diff.json")
+        self.deploy_stats_path = os.path.join(self.cache_dir, "deploy-stats.json")
+        # Kept across clean builds, entries only depend on the markup itself
+        self.parse_cache = None
+        if cache_bytes:
+            self.parse_cache = ParseCache(
+                os.path.join(self.cache_dir, "parse-cache"), cache_bytes
+            )
+
+    def __repr__(self) -> str:
+        return f"Project({self.root}, jobs: {self.jobs}, format: {self.fmt})"
+
+    def template_sources(self) -> list:
+        """The template and every partial it includes."""
+        return load_template(self.template_path).sources
+
+    def clean(self) -> None:
+        """Forget the manifests describing 'public', so all of it is redone.
+
+        'public' itself is kept: outputs that come out the same are left
+        untouched, and prune() removes the rest after the build. The asset
+        manifest is kept too, so fingerprinted copies that are still up to
+        date by size and mtime aren't hashed and copied again.
+        """
+        for manifest_path in (
+            self.manifest_path,
+            self.static_manifest_path,
+            self.gzip_manifest_path,
+        ):
+            if os.path.exists(manifest_path):
+                os.remove(manifest_path)
+
+    def build(self, incremental=False) -> dict:
+        """Build the site, from scratch unless incremental is set.
+
+        Returns the page counts of build_incremental, with the static sync's
+        counts under 'static' and the deploy manifest's under 'deploy'.
+        """
+        if not incremental:
+            self.clean()
+        os.makedirs(self.public, exist_ok=True)
+        static_stats = self.sync_static()
+        stats = build_incremental(
+            self.content,
+            self.template_path,
+            self.public,
+            self.manifest_path,
+            self.logger,
+            self.jobs,
+            self.fmt,
+            profiler=self.profiler,
+            cache=self.parse_cache,
+            strict_html=self.strict_html,
+            assets=self.assets(),
+        )
+        stats["static"] = static_stats
+        self.compress()
+        if not incremental:
+            self.prune()
+        stats["deploy"] = self.write_deploy_manifest()
+        return stats
+
+    def build_archive(self, archive_path: str) -> dict:
+        """Build the whole site into a .tar.gz or .zip at archive_path.
+
+        Static files and pages are streamed into the archive in a fixed
+        order (see ArchiveOutput), and 'public' and the manifests describing
+        it are left alone. Returns counts of built and failed pages and of
+        the bytes minifying them saved, with the static copy's under 'static'.
+        """
+        plan = plan_pages(self.content, self.public)
+        conflicts = output_conflicts(
+            {
+                os.path.relpath(markup_path, self.content): os.path.relpath(
+                    html_path, self.public
+                )
+                for markup_path, html_path in plan
+            }
+        )
+        failures = []
+        for source, message in sorted(conflicts.items()):
+            self.logger.error(f"Failed to generate {source}: {message}")
+            failures.append((os.path.join(self.content, source), message))
+        failed = {markup_path for markup_path, _ in failures}
+        plan = [page for page in plan if page[0] not in failed]
+        stats = {"saved_bytes": 0}
+        with ArchiveOutput(archive_path, self.public) as output:
+            static_stats, assets = copy_static(
+                self.static, output, self.logger, self.fmt == "minify", self.fingerprint
+            )
+            template = load_template(self.template_path)
+            if assets:
+                template = template.with_assets(assets, self.public)
+            failures += generate_pages(
+                plan,
+                self.template_path,
+                self.logger,
+                self.jobs,
+                self.fmt,
+                self.profiler,
+                self.parse_cache,
+                self.strict_html,
+                template,
+                output,
+                stats,
+            )
+        if self.parse_cache is not None:
+            self.parse_cache.evict(self.logger)
+        built = len(plan) - len(failures) + len(conflicts)
+        stats.update(built=built, failed=len(failures))
+        stats["static"] = static_stats
+        self.logger.info(f"Archive {archive_path} written: {stats}")
+        return stats
+
+    def expected_outputs(self) -> set:
+        """Every file in 'public' the manifests account for."""
+        pages = load_manifest(self.manifest_path)["pages"]
+        outputs = [entry["output"] for entry in pages.values()]
+        outputs.extend(load_static_manifest(self.static_manifest_path)["files"])
+        expected = {path.replace(os.sep, "/") for path in outputs}
+        if self.gzip:
+            # Compressing runs before pruning, so it also covers stale outputs
+            for path in load_compressed(self.gzip_manifest_path):
+                path = path.replace(os.sep, "/")
+                if path in expected:
+                    expected.add(path + ".gz")
+        return expected
+
+    def prune(self) -> int:
+        """Delete whatever in 'public' the last build didn't produce."""
+        expected = self.expected_outputs()
+        removed = 0
+        for rel_path, _ in list(scan_files(self.public)):
+            if rel_path.replace(os.sep, "/") not in expected:
+                self.logger.info(f"Removing {rel_path}, not produced by this build")
+                remove_output(os.path.join(self.public, rel_path), self.public)
+                removed += 1
+        return removed
+
+    def write_deploy_manifest(self) -> dict:
+        return write_deploy_manifest(
+            self.public,
+            self.deploy_manifest_path,
+            self.deploy_diff_path,
+            self.deploy_stats_path,
+            self.logger,
+        )
+
+    def sync_static(self) -> dict:
+        """Bring the copies of static files in 'public' up to date."""
+        return sync_static(
+            self.static,
+            self.public,
+            self.static_manifest_path,
+            self.logger,
+            self.checksum,
+            self.fmt == "minify",
+            self.asset_manifest_path if self.fingerprint else None,
+        )
+
+    def assets(self) -> dict | None:
+        """The fingerprinted names of static assets, if fingerprinting."""
+        if self.fingerprint:
+            return load_assets(self.asset_manifest_path)
+        return None
+
+    def compress(self) -> None:
+        """Bring the precompressed .gz outputs up to date, or remove them."""
+        if self.gzip:
+            precompress(self.public, self.gzip_manifest_path, self.logger, self.jobs)
+        else:
+            remove_compressed(self.public, self.gzip_manifest_path, self.logger)
+
+    def rebuild_paths(self, paths) -> dict:
+        """Rebuild whatever depends on the changed (or deleted) paths.
+
+        This runs on every save while watching, so the deploy manifest,
+        which means rescanning all of 'public', waits for the next build():
+        its diff then covers every rebuild since the previous one.
+        """
+        paths = [os.path.abspath(path) for path in paths]
+        static_changed = any(is_within(path, self.static) for path in paths)
+        if static_changed:
+            self.sync_static()
+        template_sources = set(self.template_sources())
+        if template_sources.intersection(paths):
+            sources = None
+        else:
+            sources = [path for path in paths if is_within(path, self.content)]
+            # Renamed assets need every page rewritten, which building finds out
+            if not sources and not (static_changed and self.fingerprint):
+                if static_changed:
+                    self.compress()
+                return {
+                    "built": 0,
+                    "skipped": 0,
+                    "pruned": 0,
+                    "failed": 0,
+                    "saved_bytes": 0,
+                }
+        stats = build_incremental(
+            self.content,
+            self.template_path,
+            self.public,
+            self.manifest_path,
+            self.logger,
+            self.jobs,
+            self.fmt,
+            sources,
+            self.profiler,
+            self.parse_cache,
+            self.strict_html,
+            self.assets(),
+        )
+        self.compress()
+        return stats
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import re
+from fingerprint import ReferenceRewriter, reference_pattern
+
+# {{ Name }} is a slot filled per page, {{> path }} includes a partial
+PLACEHOLDER_PATTERN = re.compile(r"{{\s*(>)?\s*([\w./-]+)\s*}}")
+# Line breaks and indentation between tags, which minified output drops
+LAYOUT_WHITESPACE_PATTERN = re.compile(r"(^|>)\s*\n\s*(<|$)")
+MAX_INCLUDE_DEPTH = 16
+
+
+class Template:
+    """A template compiled into literal segments and named placeholder slots.
+
+    parts holds the literal text with None at every slot position, and slots
+    maps those positions to placeholder names, so rendering a page is a copy,
+    a few assignments and a single join. placeholders maps those positions
+    to the placeholder as written, which is output as is when a page has
+    no value for it.
+    """
+
+    def __init__(self, parts, slots, sources, placeholders=None) -> None:
+        self.parts = parts
+        self.slots = slots
+        self.sources = sources
+        if placeholders is None:
+            placeholders = {index: f"{{{{ {name} }}}}" for index, name in slots}
+        self.placeholders = placeholders
+        self.names = {name for _, name in slots}
+        self.slot_names = dict(slots)
+        # Leading whitespace of the line each slot sits on, for pretty output
+        self.indents = {}
+        for index, name in slots:
+            line = parts[index - 1].rsplit("\n", 1)[-1] if parts[index - 1] else ""
+            self.indents.setdefault(name, line[: len(line) - len(line.lstrip())])
+        self._minified = None
+        # Set by minified(): the layout whitespace it drops from every page
+        self.saved_bytes = 0
+        # See with_assets
+        self.assets = None
+        self.asset_root = None
+        self.asset_pattern = None
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(b"\0" if part is None else part.encode("utf-8"))
+        for index, name in slots:
+            digest.update(name.encode("utf-8") + b"\0")
+            digest.update(placeholders[index].encode("utf-8") + b"\0")
+        self.digest = digest.hexdigest()
+
+    def __repr__(self) -> str:
+        slot_names = [name for _, name in self.slots]
+        return f"Template(slots: {slot_names}, sources: {self.sources})"
+
+    def render(self, values: dict) -> str:
+        chunks = []
+        self.render_into(chunks.append, values)
+        return "".join(chunks)
+
+    def render_into(self, write, values: dict, page_path: str | None = None) -> None:
+        """Write the template out in order, filling slots from values.
+
+        A value may be a string or a callable taking write, which lets large
+        slots such as the page content stream straight into the output. For
+        a template with assets, page_path is where the page is written, so
+        its references to assets can be rewritten. Placeholders without a
+        value are left as written, such as the {{ }} of inline scripts using
+        a client-side template language.
+        """
+        if self.assets and page_path is not None:
+            base = os.path.relpath(os.path.dirname(page_path), self.asset_root)
+            rewriter = ReferenceRewriter(
+                write, self.assets, base.replace(os.sep, "/"), self.asset_pattern
+            )
+            self.render_parts(rewriter.write, values)
+            rewriter.flush()
+        else:
+            self.render_parts(write, values)
+
+    def render_parts(self, write, values: dict) -> None:
+        for index, part in enumerate(self.parts):
+            if part is not None:
+                write(part)
+            elif (value := values.get(self.slot_names[index])) is None:
+                write(self.placeholders[index])
+            elif callable(value):
+                value(write)
+            else:
+                write(value)
+
+    def minified(self) -> "Template":
+        """Return this template with layout whitespace between tags removed."""
+        if self._minified is None:
+            parts = [
+                None if part is None else LAYOUT_WHITESPACE_PATTERN.sub(r"\1\2", part)
+                for part in self.parts
+            ]
+            parts[0], parts[-1] = parts[0].lstrip(), parts[-1].rstrip()
+            self._minified = Template(
+                parts, self.slots, self.sources, self.placeholders
+            )
+            # Only whitespace is dropped, a byte per character
+            self._minified.saved_bytes = sum(
+                len(old) - len(new)
+                for old, new in zip(self.parts, parts)
+                if old is not None
+            )
+            self._minified.assets = self.assets
+            self._minified.asset_root = self.asset_root
+            self._minified.asset_pattern = self.asset_pattern
+        return self._minified
+
+    def with_assets(self, assets: dict, asset_root: str) -> "Template":
+        """Return this template rewriting references to fingerprinted assets.
+
+        assets maps asset paths to their fingerprinted paths, both relative
+        to asset_root, the directory pages are written to. The digest covers
+        assets too, so pages are rebuilt when an asset's fingerprint changes.
+        """
+        template = Template(self.parts, self.slots, self.sources, self.placeholders)
+        template.assets = assets
+        template.asset_root = asset_root
+        template.asset_pattern = reference_pattern(assets)
+        digest = hashlib.sha256(self.digest.encode("utf-8"))
+        digest.update(json.dumps(assets, sort_keys=True).encode("utf-8"))
+        template.digest = digest.hexdigest()
+        return template
+
+
+def resolve_partial(name: str, including_path: str) -> str:
+    """Find a partial relative to the file that includes it."""
+    base = os.path.join(os.path.dirname(including_path), name)
+    for candidate in (base, base + ".html"):
+        if os.path.isfile(candidate):
+            return candidate
+    raise ValueError(f"Partial '{name}' included by {including_path} not found")
+
+
+def expand_template(path: str, sources: list, stack: tuple = ()) -> list:
+    """Return the (name, text) pieces of path with partials inlined.
+
+    name is None for literal text, and a slot's name for its placeholder.
+    """
+    if path in stack:
+        raise ValueError(f"Recursive partial include: {' -> '.join(stack + (path,))}")
+    elif len(stack) >= MAX_INCLUDE_DEPTH:
+        raise ValueError(f"Partials nested too deeply at {path}")
+    with open(path, "r") as file:
+        text = file.read()
+    sources.append(path)
+    pieces, position = [], 0
+    for match in PLACEHOLDER_PATTERN.finditer(text):
+        pieces.append((None, text[position : match.start()]))
+        is_partial, name = match.groups()
+        if is_partial:
+            partial_path = resolve_partial(name, path)
+            pieces.extend(expand_template(partial_path, sources, stack + (path,)))
+        else:
+            pieces.append((name, match[0]))
+        position = match.end()
+    pieces.append((None, text[position:]))
+    return pieces
+
+
+def compile_template(path: str) -> Template:
+    """Parse the template at path, including partials, into a Template."""
+    sources = []
+    parts, slots, placeholders, literal = [], [], {}, []
+    for name, text in expand_template(path, sources):
+        if name is None:
+            literal.append(text)
+        else:
+            parts.append("".join(literal))
+            literal = []
+            slots.append((len(parts), name))
+            placeholders[len(parts)] = text
+            parts.append(None)
+    parts.append("".join(literal))
+    return Template(parts, slots, sources, placeholders)
+
+
+_compiled_templates = {}
+
+
+def load_template(path: str) -> Template:
+    """Compile the template at path once, recompiling only if a source changed."""
+    cached = _compiled_templates.get(path)
+    if cached is not None:
+        template, states = cached
+        try:
+            current = source_states(template.sources)
+        except OSError:
+            current = None
+        if current == states:
+            return template
+    template = compile_template(path)
+    _compiled_templates[path] = (template, source_states(template.sources))
+    return template
+
+
+def source_states(sources: list) -> list:
+    """The (mtime, size) of each source, to tell whether any was edited."""
+    states = []
+    for source in sources:
+        stat = os.stat(source)
+        states.append((stat.st_mtime_ns, stat.st_size))
+    return states
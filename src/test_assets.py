@@ -0,0 +1,119 @@
+import unittest
+import json
+import logging
+import os
+from assets import minify_css, sync_static
+from fixtures import TempDirTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class TestSyncStatic(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        root = self.tmp.name
+        self.static = os.path.join(root, "static")
+        self.public = os.path.join(root, "public")
+        self.manifest = os.path.join(root, ".sidewinder", "static.json")
+        os.makedirs(os.path.join(self.static, "images"))
+        os.mkdir(self.public)
+        self.write(os.path.join(self.static, "index.css"), "body { color: red; }")
+        self.write(os.path.join(self.static, "images", "cat.svg"), "<svg></svg>")
+        self.write(os.path.join(self.public, "index.html"), "<p>generated</p>")
+
+    def sync(self, checksum=False, minify=False):
+        return sync_static(
+            self.static, self.public, self.manifest, logger, checksum, minify
+        )
+
+    def test_first_sync_copies_everything(self):
+        self.assertEqual(self.sync(), {"copied": 2, "skipped": 0, "removed": 0})
+        self.assertTrue(os.path.isfile(os.path.join(self.public, "images", "cat.svg")))
+
+    def test_unchanged_files_are_skipped(self):
+        self.sync()
+        self.assertEqual(self.sync(), {"copied": 0, "skipped": 2, "removed": 0})
+
+    def test_changed_file_is_copied(self):
+        self.sync()
+        self.write(os.path.join(self.static, "index.css"), "body { color: blue; }")
+        os.utime(os.path.join(self.static, "index.css"), ns=(1, 1))
+        self.assertEqual(self.sync(), {"copied": 1, "skipped": 1, "removed": 0})
+        with open(os.path.join(self.public, "index.css")) as file:
+            self.assertEqual(file.read(), "body { color: blue; }")
+
+    def test_checksum_ignores_mtime(self):
+        self.sync()
+        os.utime(os.path.join(self.static, "index.css"), ns=(1, 1))
+        self.assertEqual(self.sync(checksum=True)["skipped"], 2)
+
+    def test_stale_files_removed_generated_pages_kept(self):
+        self.sync()
+        os.remove(os.path.join(self.static, "images", "cat.svg"))
+        self.assertEqual(self.sync(), {"copied": 0, "skipped": 1, "removed": 1})
+        self.assertFalse(os.path.exists(os.path.join(self.public, "images")))
+        self.assertTrue(os.path.isfile(os.path.join(self.public, "index.html")))
+
+    def test_minify_css(self):
+        stats = self.sync(minify=True)
+        self.assertEqual((stats["copied"], stats["saved_bytes"]), (2, 5))
+        with open(os.path.join(self.public, "index.css")) as file:
+            self.assertEqual(file.read(), "body{color:red}")
+        self.assertEqual(self.sync(minify=True)["skipped"], 2)
+        # Turning minifying off copies stylesheets as written again
+        self.assertEqual(self.sync(), {"copied": 1, "skipped": 1, "removed": 0})
+        with open(os.path.join(self.public, "index.css")) as file:
+            self.assertEqual(file.read(), "body { color: red; }")
+
+    def test_fingerprint(self):
+        assets_path = os.path.join(self.tmp.name, ".sidewinder", "assets.json")
+        self.write(
+            os.path.join(self.static, "index.css"),
+            "body { background: url(images/cat.svg); }",
+        )
+        self.write(os.path.join(self.static, "robots.txt"), "")
+
+        def sync():
+            return sync_static(
+                self.static,
+                self.public,
+                self.manifest,
+                logger,
+                asset_manifest_path=assets_path,
+            )
+
+        self.assertEqual(sync(), {"copied": 3, "skipped": 0, "removed": 0})
+        with open(assets_path) as file:
+            assets = json.load(file)
+        self.assertEqual(sorted(assets), ["images/cat.svg", "index.css"])
+        self.assertRegex(assets["images/cat.svg"], r"^images/cat\.[0-9a-f]{10}\.svg$")
+        with open(os.path.join(self.public, assets["index.css"])) as file:
+            self.assertIn(assets["images/cat.svg"], file.read())
+        self.assertTrue(os.path.isfile(os.path.join(self.public, "robots.txt")))
+        self.assertEqual(sync(), {"copied": 0, "skipped": 3, "removed": 0})
+        # The stylesheet gets a new name along with the image it points at
+        self.write(os.path.join(self.static, "images", "cat.svg"), "<svg>!</svg>")
+        self.assertEqual(sync(), {"copied": 2, "skipped": 1, "removed": 2})
+
+
+class TestMinifyCss(unittest.TestCase):
+    def test_whitespace_and_comments(self):
+        css = "/* theme */\nbody , p > a {\n  color : red ;\n  margin: 0 auto;\n}\n"
+        self.assertEqual(minify_css(css), "body,p>a{color:red;margin:0 auto}")
+
+    def test_meaningful_whitespace_kept(self):
+        for css in (
+            "a :hover{x:y}",
+            "p{width:calc(1px + 2%)}",
+            "p{margin:0 !important}",
+            "@media screen and (max-width: 600px){p :first-child{x:y}}",
+            'p{content:"  /* kept */  ;}"}',
+        ):
+            self.assertEqual(minify_css(css), css)
+
+    def test_unclosed_comment(self):
+        self.assertEqual(minify_css("p{x:y}/* trailing"), "p{x:y}")
+
+
+if __name__ == "__main__":
+    unittest.main()
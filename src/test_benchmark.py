@@ -0,0 +1,42 @@
+import unittest
+import os
+import tempfile
+from benchmark import generate_corpus, read_corpus, run
+from functions import markdown_to_html_node
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_corpus_is_deterministic_and_valid(self):
+        with tempfile.TemporaryDirectory() as first:
+            second = os.path.join(first, "again")
+            generate_corpus(first, 150, seed=3)
+            generate_corpus(second, 150, seed=3)
+            documents = read_corpus(first)
+            self.assertEqual(documents, read_corpus(second))
+            self.assertEqual(len(documents), 150)
+            section = os.path.join(first, "content", "section0001")
+            self.assertTrue(os.path.isdir(section))
+            for markdown in documents:
+                markdown_to_html_node(markdown).to_html()
+
+    def test_run_times_every_stage(self):
+        result = run(pages=5, seed=0, jobs=1, prettify=False)
+        self.assertEqual(result["pages"], 5)
+        for stage in (
+            "markdown_to_blocks",
+            "text_to_text_nodes",
+            "markdown_to_html_node",
+            "to_html_pretty",
+            "templating",
+            "full_build",
+            "noop_rebuild",
+        ):
+            self.assertIn(stage, result["seconds"])
+        self.assertGreater(result["inline_cache"]["misses"], 0)
+        sizes = result["output_bytes"]
+        self.assertLessEqual(sizes["minify"], sizes["compact"])
+        self.assertLess(sizes["compact"], sizes["pretty"])
+
+
+if __name__ == "__main__":
+    unittest.main()
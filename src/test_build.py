@@ -0,0 +1,130 @@
+import unittest
+import logging
+import os
+import tempfile
+from build import build_incremental, generate_pages, load_manifest
+from fixtures import TempDirTestCase
+
+logger = logging.getLogger(__name__)
+
+
+def counts(built=0, skipped=0, pruned=0, failed=0):
+    return {
+        "built": built,
+        "skipped": skipped,
+        "pruned": pruned,
+        "failed": failed,
+        "saved_bytes": 0,
+    }
+
+
+class TestBuildIncremental(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.public = os.path.join(root, "public")
+        self.template = os.path.join(root, "template.html")
+        self.manifest = os.path.join(root, ".sidewinder", "manifest.json")
+        os.makedirs(os.path.join(self.content, "blog"))
+        os.mkdir(self.public)
+        self.write(self.template, "<html><head><title>{{ Title }}</title></head>"
+                   "<body>{{ Content }}</body></html>")
+        self.write(os.path.join(self.content, "index.md"), "# Index\n\nHello\n")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nHi\n")
+
+    def build(self):
+        return build_incremental(
+            self.content, self.template, self.public, self.manifest, logger
+        )
+
+    def test_first_build_generates_everything(self):
+        self.assertEqual(self.build(), counts(built=2))
+        self.assertTrue(os.path.isfile(os.path.join(self.public, "blog", "post.html")))
+        pages = load_manifest(self.manifest)["pages"]
+        self.assertEqual(pages[os.path.join("blog", "post.md")]["output"],
+                         os.path.join("blog", "post.html"))
+
+    def test_noop_rebuild_skips_everything(self):
+        self.build()
+        self.assertEqual(self.build(), counts(skipped=2))
+
+    def test_changed_source_rebuilds_only_that_page(self):
+        self.build()
+        self.write(os.path.join(self.content, "index.md"), "# Index\n\nChanged\n")
+        self.assertEqual(self.build(), counts(built=1, skipped=1))
+
+    def test_template_change_rebuilds_everything(self):
+        self.build()
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.assertEqual(self.build(), counts(built=2))
+
+    def test_deleted_source_is_pruned(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.assertEqual(self.build(), counts(skipped=1, pruned=1))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+
+    def test_failed_page_is_retried(self):
+        self.write(os.path.join(self.content, "broken.md"), "No title here\n\n")
+        stats = self.build()
+        self.assertEqual(stats["failed"], 1)
+        self.assertNotIn("broken.md", load_manifest(self.manifest)["pages"])
+        self.assertEqual(self.build()["failed"], 1)
+
+    def test_sources_with_the_same_output_fail(self):
+        self.build()
+        clash = os.path.join(self.content, "blog", "post.html")
+        self.write(clash, "<html><head><title>t</title></head><body></body></html>")
+        stats = self.build()
+        self.assertEqual((stats["failed"], stats["skipped"]), (2, 1))
+        pages = load_manifest(self.manifest)["pages"]
+        self.assertEqual(list(pages), ["index.md"])
+
+        def rebuild():
+            return build_incremental(
+                self.content,
+                self.template,
+                self.public,
+                self.manifest,
+                logger,
+                sources=[clash],
+            )
+
+        self.assertEqual(rebuild()["failed"], 2)
+        os.remove(clash)
+        self.assertEqual(rebuild(), counts(built=1))
+        pages = load_manifest(self.manifest)["pages"]
+        self.assertEqual(sorted(pages), [os.path.join("blog", "post.md"), "index.md"])
+
+
+class TestGeneratePages(unittest.TestCase):
+    def test_parallel_matches_serial(self):
+        with tempfile.TemporaryDirectory() as root:
+            content = os.path.join(root, "content")
+            template = os.path.join(root, "template.html")
+            os.mkdir(content)
+            with open(template, "w") as file:
+                file.write("<title>{{ Title }}</title>\n{{ Content }}")
+            serial, parallel = [], []
+            for index in range(6):
+                markup_path = os.path.join(content, f"page{index}.md")
+                with open(markup_path, "w") as file:
+                    file.write(f"# Page {index}\n\nSome *text*\n")
+                serial.append(
+                    (markup_path, os.path.join(root, "serial", f"{index}.html"))
+                )
+                parallel.append(
+                    (markup_path, os.path.join(root, "parallel", f"{index}.html"))
+                )
+            self.assertEqual(generate_pages(serial, template, logger, jobs=1), [])
+            self.assertEqual(generate_pages(parallel, template, logger, jobs=3), [])
+            for index in range(6):
+                with open(os.path.join(root, "serial", f"{index}.html")) as file:
+                    expected = file.read()
+                with open(os.path.join(root, "parallel", f"{index}.html")) as file:
+                    self.assertEqual(file.read(), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+import unittest
+import logging
+import os
+from unittest import mock
+import functions
+from cache import BlockMemo, LRUCache, ParseCache
+from functions import generate_page, markdown_to_html_node, render_markdown_blocks
+from profiling import PageProfiler
+from fixtures import TempDirTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class TestParseCache(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = ParseCache(os.path.join(self.tmp.name, "cache"), 1 << 20)
+
+    def test_round_trip(self):
+        key = self.cache.key("# Title", 1, ".md", "pretty", "  ")
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, "Title", "<h1>Title</h1>")
+        self.assertEqual(self.cache.get(key), ("Title", "<h1>Title</h1>"))
+
+    def test_key_covers_context(self):
+        key = self.cache.key("# Title", 1, ".md", "pretty", "  ")
+        self.assertNotEqual(key, self.cache.key("# Title", 2, ".md", "pretty", "  "))
+        self.assertNotEqual(key, self.cache.key("# Title", 1, ".md", "pretty", ""))
+        self.assertNotEqual(key, self.cache.key("# Title!", 1, ".md", "pretty", "  "))
+
+    def test_evicts_least_recently_used(self):
+        self.cache.max_bytes = 250
+        keys = [self.cache.key(str(index)) for index in range(3)]
+        for age, key in enumerate(keys):
+            self.cache.put(key, "Title", "x" * 80)
+            past = 1_000_000 + age
+            os.utime(self.cache.entry_path(key), (past, past))
+        # Reading the oldest entry makes the second one least recently used
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNotNone(self.cache.get(keys[2]))
+
+    def test_hit_skips_parsing(self):
+        root = self.tmp.name
+        markdown = os.path.join(root, "page.md")
+        with open(markdown, "w") as file:
+            file.write("# Title\n\nSome *text*\n")
+        records = []
+        for template_text in ("<p>{{ Title }}</p>{{ Content }}", "{{ Content }}!"):
+            template = os.path.join(root, "template.html")
+            with open(template, "w") as file:
+                file.write(template_text)
+            html = os.path.join(root, "page.html")
+            profiler = PageProfiler()
+            generate_page(
+                markdown,
+                template,
+                html,
+                logger,
+                fmt="compact",
+                profiler=profiler,
+                cache=self.cache,
+            )
+            records.append(profiler.records[0])
+            with open(html) as file:
+                page = file.read()
+        self.assertIn("parse", [stage for stage, _, _ in records[0].stages])
+        self.assertNotIn("parse", [stage for stage, _, _ in records[1].stages])
+        self.assertEqual(page, "<div><h1>Title</h1><p>Some <i>text</i></p></div>!")
+
+    def test_parser_version_invalidates(self):
+        markdown = os.path.join(self.tmp.name, "page.md")
+        with open(markdown, "w") as file:
+            file.write("# Title\n")
+        template = os.path.join(self.tmp.name, "template.html")
+        with open(template, "w") as file:
+            file.write("{{ Content }}")
+        html = os.path.join(self.tmp.name, "page.html")
+        generate_page(markdown, template, html, logger, cache=self.cache)
+        with mock.patch.object(functions, "markdown_to_html_node") as parse:
+            parse.return_value.render_into = lambda write, *args: write("new")
+            generate_page(markdown, template, html, logger, cache=self.cache)
+            parse.assert_not_called()
+            with mock.patch.object(functions, "PARSER_VERSION", -1):
+                generate_page(markdown, template, html, logger, cache=self.cache)
+            parse.assert_called_once()
+
+
+class TestBlockMemo(TempDirTestCase):
+    markdown = "# Title\n\nSome *text*\n\n* a\n* b\n\n```\ncode\n```\n\nSome *text*\n"
+
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.tmp.name, "memo.json")
+
+    def test_renders_like_node_tree(self):
+        tree = markdown_to_html_node(self.markdown)
+        for fmt in ("compact", "pretty", "minify"):
+            memo = BlockMemo(self.path, fmt)
+            self.assertEqual(
+                render_markdown_blocks(self.markdown, fmt, "  ", memo),
+                tree.to_html(fmt, "  "),
+            )
+        memo = BlockMemo(self.path, "pretty")
+        self.assertEqual(
+            render_markdown_blocks("", "pretty", "  ", memo), "  <div></div>"
+        )
+
+    def test_only_edited_blocks_rerender(self):
+        memo = BlockMemo(self.path, "pretty")
+        render_markdown_blocks(self.markdown, "pretty", "", memo)
+        # The repeated paragraph is rendered once
+        self.assertEqual((memo.hits, memo.misses), (1, 4))
+        memo.save()
+        edited = self.markdown.replace("* b", "* c")
+        memo = BlockMemo(self.path, "pretty")
+        html = render_markdown_blocks(edited, "pretty", "", memo)
+        self.assertEqual((memo.hits, memo.misses), (4, 1))
+        self.assertEqual(html, markdown_to_html_node(edited).to_html("pretty"))
+        memo.save()
+        memo = BlockMemo(self.path, "compact")
+        render_markdown_blocks(edited, "compact", "", memo)
+        self.assertEqual(memo.hits, 1)
+
+    def test_large_page_uses_memo(self):
+        cache = ParseCache(os.path.join(self.tmp.name, "cache"))
+        markdown = os.path.join(self.tmp.name, "page.md")
+        with open(markdown, "w") as file:
+            file.write(self.markdown)
+        template = os.path.join(self.tmp.name, "template.html")
+        with open(template, "w") as file:
+            file.write("<body>\n  {{ Content }}\n</body>")
+        pages = []
+        with mock.patch.object(functions, "BLOCK_MEMO_CHARS", 0):
+            for page_cache in (None, cache):
+                html = os.path.join(self.tmp.name, "page.html")
+                generate_page(markdown, template, html, logger, cache=page_cache)
+                with open(html) as file:
+                    pages.append(file.read())
+        self.assertEqual(pages[0], pages[1])
+        self.assertTrue(os.listdir(os.path.join(cache.directory, "blocks")))
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(
+            cache.stats(),
+            {"hits": 2, "misses": 1, "entries": 2, "max_entries": 2, "hit_rate": 0.667},
+        )
+
+    def test_disabled(self):
+        cache = LRUCache(0)
+        cache.put("a", 1)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import gzip
+import logging
+import os
+from compress import precompress, remove_compressed
+from fixtures import TempDirTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class TestPrecompress(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.public = os.path.join(self.tmp.name, "public")
+        self.manifest = os.path.join(self.tmp.name, ".sidewinder", "gzip.json")
+        os.makedirs(os.path.join(self.public, "blog"))
+        self.write(os.path.join(self.public, "index.html"), "<p>hello</p>\n" * 200)
+        self.write(
+            os.path.join(self.public, "blog", "post.html"), "<p>post</p>\n" * 200
+        )
+        self.write(os.path.join(self.public, "index.css"), "p {}")
+        self.write(os.path.join(self.public, "cat.png"), "not really a png" * 200)
+
+    def compress(self, jobs=2):
+        return precompress(self.public, self.manifest, logger, jobs, min_bytes=100)
+
+    def test_compresses_large_text_outputs(self):
+        stats = self.compress()
+        self.assertEqual((stats["compressed"], stats["skipped"]), (2, 0))
+        self.assertGreater(stats["saved_bytes"], 4000)
+        with gzip.open(os.path.join(self.public, "index.html.gz"), "rt") as file:
+            self.assertEqual(file.read(), "<p>hello</p>\n" * 200)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "index.css.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "cat.png.gz")))
+
+    def test_deterministic(self):
+        path = os.path.join(self.public, "index.html.gz")
+        self.compress()
+        with open(path, "rb") as file:
+            first = file.read()
+        os.remove(self.manifest)
+        self.compress(jobs=1)
+        with open(path, "rb") as file:
+            self.assertEqual(file.read(), first)
+
+    def test_unchanged_outputs_skipped(self):
+        self.compress()
+        self.write(os.path.join(self.public, "index.html"), "<p>changed</p>\n" * 200)
+        stats = self.compress()
+        self.assertEqual((stats["compressed"], stats["skipped"]), (1, 1))
+        with gzip.open(os.path.join(self.public, "index.html.gz"), "rt") as file:
+            self.assertEqual(file.read(), "<p>changed</p>\n" * 200)
+
+    def test_stale_gz_removed(self):
+        self.write(os.path.join(self.public, "own.html.gz"), "left by someone else")
+        self.compress()
+        os.remove(os.path.join(self.public, "blog", "post.html"))
+        self.write(os.path.join(self.public, "index.html"), "tiny")
+        stats = self.compress()
+        self.assertEqual(stats["removed"], 2)
+        self.assertEqual(
+            sorted(os.listdir(self.public)),
+            ["blog", "cat.png", "index.css", "index.html", "own.html.gz"],
+        )
+
+    def test_remove_compressed(self):
+        self.write(os.path.join(self.public, "own.html.gz"), "left by someone else")
+        self.compress()
+        self.assertEqual(remove_compressed(self.public, self.manifest, logger), 2)
+        self.assertFalse(os.path.exists(self.manifest))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "index.html.gz")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "own.html.gz")))
+        self.assertEqual(remove_compressed(self.public, self.manifest, logger), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import logging
+import os
+import threading
+from client import send_request, socket_path
+from daemon import BuildDaemon
+from project import Project
+from fixtures import TempDirTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class TestBuildDaemon(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.project = Project(self.tmp.name, logger)
+        os.makedirs(self.project.content)
+        os.makedirs(self.project.static)
+        self.write(self.project.template_path, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.project.content, "index.md"), "# Index\n")
+        self.path = socket_path(self.project.root)
+        self.daemon = BuildDaemon(self.project)
+        self.thread = threading.Thread(target=self.daemon.serve_until_stopped)
+        self.thread.start()
+
+    def tearDown(self):
+        if self.thread.is_alive():
+            send_request(self.path, {"command": "stop"}, timeout=10)
+        self.thread.join()
+
+    def request(self, **request):
+        return send_request(self.path, request, timeout=10)
+
+    def test_build_and_rebuild(self):
+        response = self.request(command="build")
+        self.assertEqual(response["stats"]["built"], 1)
+        page = os.path.join(self.project.content, "page.md")
+        self.write(page, "# Page\n")
+        response = self.request(command="rebuild", paths=[page])
+        self.assertEqual(response["stats"]["built"], 1)
+        self.assertTrue(os.path.isfile(os.path.join(self.project.public, "page.html")))
+        self.assertEqual(self.request(command="ping")["builds"], 2)
+
+    def test_build_checks_only_changed_files(self):
+        self.assertEqual(self.request(command="build")["stats"]["built"], 1)
+        if self.daemon.watcher is None:
+            self.skipTest("no inotify")
+        page = os.path.join(self.project.content, "page.md")
+        self.write(page, "# Page\n")
+        stats = self.request(command="build")["stats"]
+        self.assertEqual((stats["built"], stats["skipped"]), (1, 0))
+        self.assertEqual(stats["deploy"]["added"], 1)
+        self.assertTrue(os.path.isfile(os.path.join(self.project.public, "page.html")))
+        os.remove(page)
+        stats = self.request(command="build")["stats"]
+        self.assertEqual((stats["pruned"], stats["deploy"]["deleted"]), (1, 1))
+        stats = self.request(command="build", incremental=False)["stats"]
+        self.assertEqual(stats["built"], 1)
+
+    def test_bad_request(self):
+        response = self.request(command="rebuild")
+        self.assertFalse(response["ok"])
+        self.assertIn("ValueError", response["error"])
+        self.assertFalse(self.request(command="explode")["ok"])
+        self.assertTrue(self.request(command="ping")["ok"])
+
+    def test_stop_removes_socket(self):
+        self.assertTrue(self.request(command="stop")["ok"])
+        self.thread.join()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_single_daemon_per_project(self):
+        self.assertRaises(ValueError, BuildDaemon, self.project)
+        self.request(command="stop")
+        self.thread.join()
+        # A socket file left behind by a crashed daemon is taken over
+        self.write(self.path, "")
+        daemon = BuildDaemon(self.project)
+        daemon.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import json
+import logging
+import os
+from deploy import diff_manifests, scan_outputs, write_deploy_manifest
+from fixtures import TempDirTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class TestDeployManifest(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.public = os.path.join(self.tmp.name, "public")
+        os.makedirs(os.path.join(self.public, "blog"))
+        self.write(os.path.join(self.public, "index.html"), "<p>index</p>")
+        self.write(os.path.join(self.public, "blog", "post.html"), "<p>post</p>")
+        self.paths = [
+            os.path.join(self.tmp.name, name)
+            for name in ("deploy.json", "deploy-diff.json", "deploy-stats.json")
+        ]
+
+    def deploy(self):
+        return write_deploy_manifest(self.public, *self.paths, logger)
+
+    def test_manifest(self):
+        manifest, stats = scan_outputs(self.public, {})
+        self.assertEqual(sorted(manifest["files"]), ["blog/post.html", "index.html"])
+        self.assertEqual(
+            manifest["files"]["index.html"],
+            {
+                "size": 12,
+                "sha256": "dfb6de9fb6d8ea54cfed04f2240f46a0a4d29050550fedfe5b2e1062e77114f6",
+            },
+        )
+        # Unchanged files aren't hashed again
+        stats["index.html"][2] = "cached"
+        manifest, _ = scan_outputs(self.public, stats)
+        self.assertEqual(manifest["files"]["index.html"]["sha256"], "cached")
+
+    def test_diff(self):
+        self.assertEqual(self.deploy(), {"added": 2, "changed": 0, "deleted": 0})
+        with open(self.paths[0]) as file:
+            first = file.read()
+        self.assertEqual(self.deploy(), {"added": 0, "changed": 0, "deleted": 0})
+        with open(self.paths[0]) as file:
+            self.assertEqual(file.read(), first)
+        self.write(os.path.join(self.public, "index.html"), "<p>new index</p>")
+        self.write(os.path.join(self.public, "about.html"), "<p>about</p>")
+        os.remove(os.path.join(self.public, "blog", "post.html"))
+        self.deploy()
+        with open(self.paths[1]) as file:
+            self.assertEqual(
+                json.load(file),
+                {
+                    "added": ["about.html"],
+                    "changed": ["index.html"],
+                    "deleted": ["blog/post.html"],
+                },
+            )
+
+    def test_diff_manifests(self):
+        old = {"files": {"a": {"size": 1, "sha256": "x"}}}
+        new = {"files": {"a": {"size": 1, "sha256": "y"}}}
+        self.assertEqual(
+            diff_manifests(old, new), {"added": [], "changed": ["a"], "deleted": []}
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import unittest
+import logging
+import os
+import tempfile
+from unittest import mock
+import functions
+from document import Document
+from functions import (
+    generate_page,
+    markdown_to_document,
+    markdown_to_html_node,
+    stream_markdown,
+)
+
+logger = logging.getLogger(__name__)
+
+MARKDOWN = """# A *title*
+
+Some **bold**, *italic* and `code`
+spanning   two lines, a [link](/to/page) and ![an image](/img.png).
+
+> quoted *text*
+> over two lines
+
+* first `item`
+* second [item](/second)
+
+1. one
+2. **two**
+
+```
+def main():
+
+    return  1
+```
+"""
+
+
+class TestDocument(unittest.TestCase):
+    def test_renders_like_node_tree(self):
+        tree = markdown_to_html_node(MARKDOWN)
+        document = markdown_to_document(MARKDOWN)
+        for fmt in ("compact", "pretty", "minify"):
+            self.assertEqual(document.to_html(fmt), tree.to_html(fmt))
+        self.assertEqual(
+            document.to_html("pretty", "    "), tree.to_html("pretty", "    ")
+        )
+
+    def test_flat_arrays(self):
+        document = markdown_to_document("* a\n* b **c**\n")
+        # div, ul, two li, the texts "a" and "b " and the bold "c"
+        self.assertEqual(len(document), 7)
+        self.assertEqual(document.subtree_ends[0], 7)
+        self.assertEqual(document.nbytes(), 7 * 21)
+        self.assertEqual(document.text, "a\nb **c**")
+
+    def test_unmatched_inline_delimiters(self):
+        for markdown in ("some *text", "* an `item", "**a *b* c**"):
+            self.assertEqual(
+                markdown_to_document(markdown).to_html(),
+                markdown_to_html_node(markdown).to_html(),
+            )
+
+    def test_empty(self):
+        self.assertEqual(Document().to_html(), "")
+        self.assertEqual(markdown_to_document("").to_html(), "<div></div>")
+
+    def test_large_page_uses_document(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            template = os.path.join(tmp, "template.html")
+            with open(template, "w") as file:
+                file.write("<title>{{ Title }}</title><body>{{ Content }}</body>")
+            markdown = os.path.join(tmp, "page.md")
+            with open(markdown, "w") as file:
+                file.write(MARKDOWN)
+            outputs = []
+            for threshold in (1 << 30, 0):
+                html = os.path.join(tmp, f"page{threshold}.html")
+                with mock.patch.object(functions, "LARGE_PAGE_CHARS", threshold):
+                    generate_page(markdown, template, html, logger)
+                with open(html) as file:
+                    outputs.append(file.read())
+            self.assertEqual(outputs[0], outputs[1])
+
+
+class TestStreamMarkdown(unittest.TestCase):
+    def test_renders_like_node_tree(self):
+        tree = markdown_to_html_node(MARKDOWN)
+        for part_lines in (1, 2, 1024):
+            with mock.patch.object(functions, "STREAM_PART_LINES", part_lines):
+                for fmt in ("compact", "pretty", "minify"):
+                    chunks = []
+                    stream_markdown(MARKDOWN.split("\n"), chunks.append, fmt, "  ")
+                    self.assertEqual("".join(chunks), tree.to_html(fmt, "  "))
+
+    def test_ordered_list_parts_keep_count(self):
+        markdown = ["1. one", "2. two", "3. three", "5. five"]
+        chunks = []
+        with mock.patch.object(functions, "STREAM_PART_LINES", 2):
+            stream_markdown(markdown, chunks.append, "compact")
+        # Parts of the list were written already, so it ends where it breaks
+        self.assertEqual(
+            "".join(chunks),
+            "<div><ol><li>one</li><li>two</li><li>three</li></ol><p>5. five</p></div>",
+        )
+
+    def test_large_file_is_streamed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            template = os.path.join(tmp, "template.html")
+            with open(template, "w") as file:
+                file.write("<title>{{ Title }}</title>\n<body>\n  {{ Content }}\n")
+            markdown = os.path.join(tmp, "page.md")
+            with open(markdown, "w") as file:
+                file.write(MARKDOWN)
+            outputs = []
+            for threshold in (1 << 30, 0):
+                html = os.path.join(tmp, f"page{threshold}.html")
+                with mock.patch.object(functions, "STREAM_PAGE_BYTES", threshold):
+                    with mock.patch.object(functions, "markdown_to_html_node") as parse:
+                        parse.side_effect = markdown_to_html_node
+                        generate_page(markdown, template, html, logger)
+                    self.assertEqual(parse.called, threshold != 0)
+                with open(html) as file:
+                    outputs.append(file.read())
+            self.assertEqual(outputs[0], outputs[1])
+            self.assertIn("<title>A *title*</title>", outputs[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from fingerprint import (
+    fingerprint_path,
+    fingerprinted_url,
+    rewrite_css_urls,
+    rewrite_references,
+)
+
+ASSETS = {
+    "index.css": "index.0123456789.css",
+    "images/cat.png": "images/cat.abcdef0123.png",
+}
+
+
+class TestFingerprint(unittest.TestCase):
+    def test_fingerprint_path(self):
+        self.assertEqual(
+            fingerprint_path("images/cat.png", "abcdef0123456789"),
+            "images/cat.abcdef0123.png",
+        )
+
+    def test_fingerprinted_url(self):
+        for url, base, expected in (
+            ("/index.css", "blog", "/index.0123456789.css"),
+            ("index.css?v=2#top", "", "index.0123456789.css?v=2#top"),
+            ("../images/cat.png", "blog", "../images/cat.abcdef0123.png"),
+            ("./images/cat.png", "", "./images/cat.abcdef0123.png"),
+            ("images/cat.png", "blog", "images/cat.png"),
+            ("https://example.com/index.css", "", "https://example.com/index.css"),
+            ("//cdn.example.com/index.css", "", "//cdn.example.com/index.css"),
+            ("#index.css", "", "#index.css"),
+            ("/", "", "/"),
+        ):
+            self.assertEqual(fingerprinted_url(url, ASSETS, base), expected)
+
+    def test_rewrite_references(self):
+        html = (
+            '<link rel="stylesheet" href="/index.css">'
+            "<img src='../images/cat.png' alt=\"/index.css\">"
+            '<a href="/about.html">index.css</a>'
+            '<IMG SRC = "/index.css" title="/index.css">'
+        )
+        self.assertEqual(
+            rewrite_references(html, ASSETS, "blog"),
+            '<link rel="stylesheet" href="/index.0123456789.css">'
+            "<img src='../images/cat.abcdef0123.png' alt=\"/index.css\">"
+            '<a href="/about.html">index.css</a>'
+            '<IMG SRC = "/index.0123456789.css" title="/index.css">',
+        )
+
+    def test_rewrite_css_urls(self):
+        css = "a{background:url(../images/cat.png)}b{background:url( 'x.png' )}"
+        self.assertEqual(
+            rewrite_css_urls(css, ASSETS, "styles"),
+            "a{background:url(../images/cat.abcdef0123.png)}"
+            "b{background:url( 'x.png' )}",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
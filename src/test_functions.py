@@ -13,10 +13,14 @@ from functions import (
     split_nodes_link,
     text_to_text_nodes,
     markdown_to_blocks,
+    lex_blocks,
+    lex_block_parts,
     block_to_block_type,
     markdown_to_html_node,
     extract_title,
-    validate_html
+    validate_html,
+    text_to_children,
+    INLINE_CACHE,
 )
 logger = logging.getLogger(__name__)
 
@@ -275,6 +279,37 @@ class TestTextToTextNodes(unittest.TestCase):
             ],
         )
 
+    def test_text_to_text_nodes_multiple_links_images(self):
+        text = "[a](https://a.org) and ![b](b.png), [c](https://c.org)![d](d.png)"
+        self.assertEqual(
+            text_to_text_nodes(text),
+            [
+                TextNode("a", TextType.LINK, "https://a.org"),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("b", TextType.IMAGE, "b.png"),
+                TextNode(", ", TextType.TEXT),
+                TextNode("c", TextType.LINK, "https://c.org"),
+                TextNode("d", TextType.IMAGE, "d.png"),
+            ],
+        )
+
+    def test_text_to_text_nodes_nested_in_bold(self):
+        self.assertEqual(
+            text_to_text_nodes("**bold *it* `x` more** after"),
+            [
+                TextNode("bold *it* `x` more", TextType.BOLD),
+                TextNode(" after", TextType.TEXT),
+            ],
+        )
+        self.assertEqual(
+            markdown_to_html_node("**bold *it* more**").to_html(),
+            "<div><p><b>bold *it* more</b></p></div>",
+        )
+
+    def test_text_to_text_nodes_unmatched_delimiters(self):
+        for text in ("some **bold text", "a `code span", "2 * 3"):
+            self.assertEqual(text_to_text_nodes(text), [TextNode(text, TextType.TEXT)])
+
 
 class TestMarkdownBlocks(unittest.TestCase):
     block = "\n".join(
@@ -366,6 +401,87 @@ class TestMarkdownBlocks(unittest.TestCase):
             result_actual.append(block_to_block_type(block))
         self.assertEqual(result_actual, self.block_types)
 
+    def test_lex_blocks(self):
+        md = "\n".join(
+            [
+                "## Heading",
+                "Text right under it",
+                "",
+                "```py",
+                "def f():",
+                "",
+                "    return 1",
+                "```",
+                "1. one",
+                "2. two",
+            ]
+        )
+        self.assertEqual(
+            list(lex_blocks(md)),
+            [
+                ("heading", ["## Heading"]),
+                ("paragraph", ["Text right under it"]),
+                ("code", ["```py", "def f():", "", "    return 1", "```"]),
+                ("ordered_list", ["1. one", "2. two"]),
+            ],
+        )
+
+    def test_lex_blocks_unterminated_code(self):
+        self.assertEqual(
+            list(lex_blocks("```\nx = 1\n\n# Title\n")),
+            [("paragraph", ["```", "x = 1"]), ("heading", ["# Title"])],
+        )
+        self.assertEqual(
+            list(lex_blocks("```inline``` text\n\n```\ncode\n```")),
+            [("paragraph", ["```inline``` text"]), ("code", ["```", "code", "```"])],
+        )
+        self.assertEqual(
+            markdown_to_html_node("```inline``` text\n\n# Title").to_html(),
+            "<div><p><code>inline</code> text</p><h1>Title</h1></div>",
+        )
+
+    def test_lex_blocks_misnumbered_list(self):
+        self.assertEqual(
+            list(lex_blocks("2019. was a year\n\n1. one\n3. three\n")),
+            [
+                ("paragraph", ["2019. was a year"]),
+                ("paragraph", ["1. one", "3. three"]),
+            ],
+        )
+        self.assertEqual(
+            list(lex_block_parts(["1. a", "2. b", "4. d"], max_lines=2)),
+            [
+                ("ordered_list", ["1. a", "2. b"], True, False),
+                ("ordered_list", [], False, True),
+                ("paragraph", ["4. d"], True, True),
+            ],
+        )
+
+    def test_lex_block_parts(self):
+        lines = ["* a", "* b", "* c", "", "```", "x", "", "", "y", "", ""]
+        self.assertEqual(
+            list(lex_block_parts(lines, max_lines=2)),
+            [
+                ("unordered_list", ["* a", "* b"], True, False),
+                ("unordered_list", ["* c"], False, True),
+                ("code", ["```", "x"], True, False),
+                ("code", ["", "", "y"], False, False),
+                ("code", ["```"], False, True),
+            ],
+        )
+        lines = ["a", "b", "c", "", "> d", "> e", "> f"]
+        self.assertEqual(
+            list(lex_block_parts(lines, max_lines=2)),
+            [
+                ("paragraph", ["a", "b", "c"], True, True),
+                ("quote", ["> d", "> e", "> f"], True, True),
+            ],
+        )
+
+    def test_block_to_block_type_falls_back_to_paragraph(self):
+        for block in ("1. one\n3. three", "2019. was a year", "```x``` y", "```\nx"):
+            self.assertEqual(block_to_block_type(block), "paragraph")
+
 
 class TestMarkdownToHTMLNode(unittest.TestCase):
     md = "\n".join(
@@ -464,18 +580,32 @@ class TestMarkdownToHTMLNode(unittest.TestCase):
         actual = markdown_to_html_node(self.md)
         self.assertNodesEqual(actual, expected)
 
+    def test_inline_cache(self):
+        INLINE_CACHE.clear()
+        first = text_to_children("see [the docs](/docs) **now**")
+        second = text_to_children("see [the docs](/docs) **now**")
+        self.assertEqual((INLINE_CACHE.hits, INLINE_CACHE.misses), (1, 1))
+        self.assertIsNot(first, second)
+        self.assertEqual(
+            [node.to_html() for node in second], [node.to_html() for node in first]
+        )
+        second.append(None)
+        self.assertEqual(len(text_to_children("see [the docs](/docs) **now**")), 4)
+        text_to_children("long " * 100)
+        self.assertEqual(len(INLINE_CACHE), 1)
+
 
 class TestMakeWebpage(unittest.TestCase):
     proj_root = os.getcwd()
-    content = os.path.join(proj_root, "content")
     if os.path.split(proj_root)[1] != "sidewinder":
         raise Exception(f"Invalid cwd: {proj_root}\nTry again in project root")
 
-    test_md = os.path.join(content, "test.md")
-    test_html = os.path.join(content, "test.html")
+    # Kept out of 'content', which is the site itself
+    test_md = os.path.join(proj_root, "test", "test.md")
+    test_html = os.path.join(proj_root, "test", "test.html")
     test2_html = os.path.join(proj_root, "test/test2.html")
     if not os.path.isfile(test_md) or not os.path.isfile(test_html):
-        raise Exception("test markup not found in sidewinder/content/")
+        raise Exception("test markup not found in sidewinder/test/")
 
     def test_extract_title_md(self):
         with open(self.test_md, "r") as file:
@@ -0,0 +1,100 @@
+import unittest
+import logging
+import os
+import tempfile
+from functions import generate_page
+from htmlinput import minify_html, scan_html_input
+
+logger = logging.getLogger(__name__)
+
+
+class TestScanHtmlInput(unittest.TestCase):
+    def test_title_and_raw_body(self):
+        markup = (
+            "<!doctype html>\n<html>\n<head>\n  <title>Fish &amp; Chips</title>\n"
+            '</head>\n<BODY class="x">\n<p>a <br> b</p>\n</BODY>\n</html>\n'
+        )
+        self.assertEqual(
+            scan_html_input(markup, logger), ("Fish & Chips", "\n<p>a <br> b</p>\n")
+        )
+
+    def test_last_closing_body(self):
+        markup = (
+            "<html><head><title>t</title></head><body>"
+            "<script>let s = '</body>';</script></body></html>"
+        )
+        _, content = scan_html_input(markup, logger)
+        self.assertEqual(content, "<script>let s = '</body>';</script>")
+
+    def test_unclosed_body(self):
+        markup = "<html><head><title>t</title></head><body><p>hi</p>"
+        self.assertEqual(scan_html_input(markup, logger), ("t", "<p>hi</p>"))
+
+    def test_invalid(self):
+        for markup in (
+            "<html><head></head><body></body></html>",
+            "<html><title>t</title><body></body></html>",
+            "<html><head><title>t</title></head></html>",
+            '<html><head><title>t</title><link rel="Stylesheet" href="a.css">'
+            "</head><body></body></html>",
+        ):
+            self.assertRaises(ValueError, scan_html_input, markup, logger)
+
+    def test_stylesheet_in_body_allowed(self):
+        markup = (
+            "<html><head><title>t</title></head>"
+            '<body><link rel="stylesheet" href="a.css"></body></html>'
+        )
+        self.assertEqual(scan_html_input(markup, logger)[0], "t")
+
+    def test_generate_page_strict(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            template = os.path.join(tmp, "template.html")
+            with open(template, "w") as file:
+                file.write("<title>{{ Title }}</title>{{ Content }}")
+            markup = os.path.join(tmp, "page.html")
+            with open(markup, "w") as file:
+                file.write("<html><head><title>t</title></head><body>x</body></html>")
+            html = os.path.join(tmp, "page.out.html")
+            for strict_html in (False, True):
+                generate_page(markup, template, html, logger, strict_html=strict_html)
+                with open(html) as file:
+                    self.assertEqual(file.read(), "<title>t</title>x")
+
+    def test_minify_html(self):
+        html = (
+            "\n  <div>\n    <p>two   words\n  here</p>\n"
+            "    <pre>  keep\n    this</pre>\n"
+            "    <SCRIPT>if (a)\n  b();</SCRIPT>\n  </div>\n"
+        )
+        self.assertEqual(
+            minify_html(html),
+            "<div><p>two words here</p><pre>  keep\n    this</pre>"
+            "<SCRIPT>if (a)\n  b();</SCRIPT></div>",
+        )
+
+    def test_generate_page_minify(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            template = os.path.join(tmp, "template.html")
+            with open(template, "w") as file:
+                file.write("<html>\n  <title>{{ Title }}</title>\n{{ Content }}</html>")
+            markup = os.path.join(tmp, "page.html")
+            with open(markup, "w") as file:
+                file.write(
+                    "<html><head><title>t</title></head><body>\n"
+                    "  <p>a\n  b</p>\n  <pre> c\n d</pre>\n</body></html>"
+                )
+            html = os.path.join(tmp, "page.out.html")
+            saved = generate_page(markup, template, html, logger, fmt="minify")
+            with open(html) as file:
+                minified = file.read()
+            self.assertEqual(
+                minified, "<html><title>t</title><p>a b</p><pre> c\n d</pre></html>"
+            )
+            generate_page(markup, template, html, logger, fmt="compact")
+            with open(html) as file:
+                self.assertEqual(saved, len(file.read()) - len(minified))
+
+
+if __name__ == "__main__":
+    unittest.main()
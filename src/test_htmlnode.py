@@ -41,6 +41,14 @@ class TestLeafNode(unittest.TestCase):
     def test_to_html_none_tag(self):
         self.assertEqual(self.leaf2.to_html(), "howdy")
 
+    def test_to_html_props(self):
+        link = LeafNode("a", "gnu", props={"href": "https://gnu.org"})
+        self.assertEqual(link.to_html(), '<a href="https://gnu.org">gnu</a>')
+
+    def test_to_html_void(self):
+        image = LeafNode("img", None, props={"src": "cat.png", "alt": "a cat"})
+        self.assertEqual(image.to_html(), '<img src="cat.png" alt="a cat">')
+
 
 class TestParentNode(unittest.TestCase):
     node = ParentNode(
@@ -91,6 +99,75 @@ class TestParentNode(unittest.TestCase):
             "<div></div>"
         )
 
+    def test_iter_reentrant(self):
+        pairs = [(outer.value, inner.value) for outer in self.node for inner in self.node]
+        self.assertEqual(len(pairs), 16)
+        self.assertEqual(list(self.node), self.node.children)
+
+    def test_slots(self):
+        self.assertFalse(hasattr(self.node, "__dict__"))
+        self.assertFalse(hasattr(LeafNode("b", "bold"), "__dict__"))
+
+
+class TestFormats(unittest.TestCase):
+    node = ParentNode(
+        "div",
+        [
+            LeafNode("h1", "Title"),
+            ParentNode("p", [LeafNode(None, "some\n  text "), LeafNode("b", "bold")]),
+            ParentNode("ul", [LeafNode("li", "one"), LeafNode("li", "two")]),
+            ParentNode("pre", [LeafNode("code", "x  =\n  1")]),
+        ],
+    )
+
+    def test_compact(self):
+        self.assertEqual(
+            self.node.to_html("compact"),
+            "<div><h1>Title</h1><p>some\n  text <b>bold</b></p>"
+            "<ul><li>one</li><li>two</li></ul><pre><code>x  =\n  1</code></pre></div>",
+        )
+
+    def test_pretty(self):
+        self.assertEqual(
+            self.node.to_html("pretty", "  "),
+            "\n".join(
+                [
+                    "  <div>",
+                    "    <h1>Title</h1>",
+                    "    <p>some\n  text <b>bold</b></p>",
+                    "    <ul>",
+                    "      <li>one</li>",
+                    "      <li>two</li>",
+                    "    </ul>",
+                    "    <pre><code>x  =\n  1</code></pre>",
+                    "  </div>",
+                ]
+            ),
+        )
+
+    def test_minify_preserves_code(self):
+        self.assertEqual(
+            self.node.to_html("minify"),
+            "<div><h1>Title</h1><p>some text <b>bold</b></p>"
+            "<ul><li>one</li><li>two</li></ul><pre><code>x  =\n  1</code></pre></div>",
+        )
+
+    def test_render_into(self):
+        for fmt in ("compact", "pretty", "minify"):
+            chunks = []
+            self.node.render_into(chunks.append, fmt)
+            self.assertGreater(len(chunks), 1)
+            self.assertEqual("".join(chunks), self.node.to_html(fmt))
+
+    def test_wide_tree(self):
+        items = [LeafNode("li", str(index)) for index in range(50000)]
+        html = ParentNode("ul", items).to_html()
+        self.assertTrue(html.startswith("<ul><li>0</li><li>1</li>"))
+        self.assertTrue(html.endswith("<li>49999</li></ul>"))
+
+    def test_invalid_format(self):
+        self.assertRaises(ValueError, self.node.to_html, "fancy")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,16 @@
+import unittest
+import contextlib
+import io
+from main import parse_args
+
+
+class TestParseArgs(unittest.TestCase):
+    def test_negative_counts_rejected(self):
+        self.assertEqual(parse_args(["-j", "0", "--cache-size", "0"]).jobs, 0)
+        for argv in (["--jobs", "-1"], ["--cache-size", "-5"]):
+            with contextlib.redirect_stderr(io.StringIO()):
+                self.assertRaises(SystemExit, parse_args, argv)
+
+
+if __name__ == "__main__":
+    unittest.main()
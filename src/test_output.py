@@ -0,0 +1,79 @@
+import unittest
+import os
+import tarfile
+import tempfile
+import zipfile
+from output import ArchiveOutput, archive_mtime, replace_if_changed
+from fixtures import TempDirTestCase
+
+
+class TestReplaceIfChanged(unittest.TestCase):
+    def test_unchanged_file_kept(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path, tmp_path = os.path.join(tmp, "page"), os.path.join(tmp, "tmp")
+            for name in (path, tmp_path):
+                with open(name, "w") as file:
+                    file.write("same")
+            os.utime(path, ns=(1, 1))
+            self.assertFalse(replace_if_changed(tmp_path, path))
+            self.assertEqual(os.stat(path).st_mtime_ns, 1)
+            self.assertFalse(os.path.exists(tmp_path))
+
+
+class TestArchiveOutput(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = os.path.join(self.tmp.name, "public")
+        self.source = os.path.join(self.tmp.name, "logo.svg")
+        self.write(self.source, "<svg></svg>")
+
+    def write_site(self, path):
+        with ArchiveOutput(path, self.root) as output:
+            output.add_file(os.path.join(self.root, "logo.svg"), self.source)
+            with output.open(os.path.join(self.root, "blog", "a.html"), "w") as file:
+                file.write("<p>é</p>")
+        with open(path, "rb") as file:
+            return file.read()
+
+    def test_tar_is_reproducible(self):
+        path = os.path.join(self.tmp.name, "site.tar.gz")
+        first = self.write_site(path)
+        os.utime(self.source, ns=(1, 1))
+        self.assertEqual(self.write_site(path), first)
+        with tarfile.open(path) as archive:
+            self.assertEqual(archive.getnames(), ["logo.svg", "blog/a.html"])
+            member = archive.getmember("blog/a.html")
+            self.assertEqual((member.mtime, member.mode), (archive_mtime(), 0o644))
+            self.assertEqual(archive.extractfile(member).read(), "<p>é</p>".encode())
+
+    def test_zip_is_reproducible(self):
+        path = os.path.join(self.tmp.name, "site.zip")
+        first = self.write_site(path)
+        self.assertEqual(self.write_site(path), first)
+        with zipfile.ZipFile(path) as archive:
+            self.assertEqual(archive.namelist(), ["logo.svg", "blog/a.html"])
+            self.assertEqual(archive.getinfo("logo.svg").date_time[0], 1980)
+
+    def test_failed_entry_and_archive_dropped(self):
+        path = os.path.join(self.tmp.name, "site.zip")
+        with self.assertRaises(RuntimeError):
+            with ArchiveOutput(path, self.root) as output:
+                output.write(os.path.join(self.root, "a.html"), b"a")
+                with output.open(os.path.join(self.root, "b.html")) as file:
+                    file.write(b"partial")
+                    raise RuntimeError("render failed")
+        self.assertEqual(os.listdir(self.tmp.name), ["logo.svg"])
+
+    def test_invalid_names(self):
+        with self.assertRaises(ValueError):
+            ArchiveOutput(os.path.join(self.tmp.name, "site.rar"), self.root)
+        with ArchiveOutput(os.path.join(self.tmp.name, "site.tgz"), self.root) as out:
+            out.write(os.path.join(self.root, "a.html"), b"a")
+            with self.assertRaises(ValueError):
+                out.write(os.path.join(self.root, "a.html"), b"b")
+            with self.assertRaises(ValueError):
+                out.write(self.source, b"outside")
+
+
+if __name__ == "__main__":
+    unittest.main()
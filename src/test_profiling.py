@@ -0,0 +1,54 @@
+import unittest
+import logging
+import os
+import pstats
+from build import generate_pages
+from profiling import PageProfiler
+from fixtures import TempDirTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class TestPageProfiler(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        root = self.tmp.name
+        self.template = os.path.join(root, "template.html")
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.plan = []
+        for index in range(4):
+            markup_path = os.path.join(root, f"page{index}.md")
+            text = f"# Page {index}\n\n" + "Some *text*\n\n" * index * 50
+            self.write(markup_path, text)
+            self.plan.append((markup_path, os.path.join(root, f"page{index}.html")))
+
+    def test_stages_recorded_with_callbacks(self):
+        seen = []
+        profiler = PageProfiler(
+            on_stage=lambda path, stage, seconds, peak: seen.append(stage)
+        )
+        generate_pages(self.plan, self.template, logger, profiler=profiler)
+        self.assertEqual(len(profiler.records), 4)
+        self.assertEqual(seen[:4], ["read", "title", "parse", "render"])
+        self.assertEqual(
+            set(profiler.stage_totals()), {"read", "title", "parse", "render"}
+        )
+        self.assertIn("Profiled 4 page(s)", profiler.report())
+
+    def test_memory_and_slowest_profiles(self):
+        profiler = PageProfiler(trace_memory=True, profile_slowest=2)
+        generate_pages(self.plan, self.template, logger, jobs=2, profiler=profiler)
+        for record in profiler.records:
+            for _, _, peak in record.stages:
+                self.assertGreaterEqual(peak, 0)
+        paths = profiler.dump_profiles(os.path.join(self.tmp.name, "profiles"))
+        self.assertEqual(len(paths), 2)
+        self.assertEqual(
+            [os.path.basename(path)[:3] for path in paths], ["01-", "02-"]
+        )
+        for path in paths:
+            pstats.Stats(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
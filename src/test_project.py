@@ -0,0 +1,157 @@
+import unittest
+import json
+import logging
+import os
+import shutil
+import tarfile
+import zipfile
+from project import Project
+from fixtures import TempDirTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class TestProject(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.project = Project(self.tmp.name, logger)
+        os.makedirs(os.path.join(self.project.content, "blog"))
+        os.makedirs(self.project.static)
+        self.write(self.project.template_path, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.project.content, "index.md"), "# Index\n")
+        self.write(os.path.join(self.project.content, "blog", "post.md"), "# Post\n")
+        self.write(os.path.join(self.project.static, "index.css"), "p {}")
+        self.project.build()
+
+    def public(self, *parts):
+        return os.path.join(self.project.public, *parts)
+
+    def test_build_from_scratch(self):
+        os.remove(os.path.join(self.project.content, "blog", "post.md"))
+        self.write(self.public("leftover.html"), "old")
+        self.assertEqual(self.project.build()["built"], 1)
+        self.assertFalse(os.path.exists(self.public("leftover.html")))
+        self.assertFalse(os.path.exists(self.public("blog")))
+        self.assertTrue(os.path.isfile(self.public("index.css")))
+
+    def test_clean_build_keeps_unchanged_outputs(self):
+        index = self.public("index.html")
+        os.utime(index, ns=(1, 1))
+        self.write(os.path.join(self.project.content, "blog", "post.md"), "# New\n")
+        stats = self.project.build()
+        self.assertEqual(stats["built"], 2)
+        self.assertEqual(os.stat(index).st_mtime_ns, 1)
+        self.assertEqual(stats["deploy"], {"added": 0, "changed": 1, "deleted": 0})
+        with open(self.project.deploy_diff_path) as file:
+            self.assertEqual(json.load(file)["changed"], ["blog/post.html"])
+
+    def test_clean_gzip_build_prunes_deleted_page(self):
+        self.project.gzip = True
+        post = os.path.join(self.project.content, "blog", "post.md")
+        self.write(post, "# Post\n" * 200)
+        self.project.build()
+        self.assertTrue(os.path.isfile(self.public("blog", "post.html.gz")))
+        os.remove(post)
+        self.project.build()
+        self.assertFalse(os.path.exists(self.public("blog")))
+
+    def test_rebuild_changed_page_only(self):
+        post = os.path.join(self.project.content, "blog", "post.md")
+        self.write(post, "# Edited post\n")
+        stats = self.project.rebuild_paths([post])
+        self.assertEqual((stats["built"], stats["skipped"]), (1, 0))
+        with open(self.public("blog", "post.html")) as file:
+            self.assertIn("Edited post", file.read())
+
+    def test_rebuild_deleted_page(self):
+        post = os.path.join(self.project.content, "blog", "post.md")
+        os.remove(post)
+        self.assertEqual(self.project.rebuild_paths([post])["pruned"], 1)
+        self.assertFalse(os.path.exists(self.public("blog", "post.html")))
+        self.assertTrue(os.path.isfile(self.public("index.html")))
+
+    def test_rebuild_template_rebuilds_everything(self):
+        self.write(self.project.template_path, "<h1>{{ Title }}</h1>{{ Content }}")
+        stats = self.project.rebuild_paths([self.project.template_path])
+        self.assertEqual(stats["built"], 2)
+
+    def test_rebuild_static(self):
+        css = os.path.join(self.project.static, "index.css")
+        self.write(css, "p { color: red; }")
+        self.project.rebuild_paths([css])
+        with open(self.public("index.css")) as file:
+            self.assertEqual(file.read(), "p { color: red; }")
+
+    def test_fingerprinted_assets(self):
+        self.project.fingerprint = True
+        self.write(
+            self.project.template_path,
+            '<link href="/index.css"><title>{{ Title }}</title>{{ Content }}',
+        )
+        self.write(
+            os.path.join(self.project.content, "blog", "post.md"),
+            "# Post\n\n![logo](../logo.svg)\n",
+        )
+        self.write(os.path.join(self.project.static, "logo.svg"), "<svg></svg>")
+        self.assertEqual(self.project.build(incremental=True)["built"], 2)
+        assets = self.project.assets()
+        self.assertEqual(sorted(assets), ["index.css", "logo.svg"])
+        self.assertFalse(os.path.exists(self.public("index.css")))
+        with open(self.public("blog", "post.html")) as file:
+            page = file.read()
+        self.assertIn(f'href="/{assets["index.css"]}"', page)
+        self.assertIn(f'src="../{assets["logo.svg"]}"', page)
+        # A changed asset gets a new name, so every page is rewritten
+        css = os.path.join(self.project.static, "index.css")
+        self.write(css, "p { color: red; }")
+        self.assertEqual(self.project.rebuild_paths([css])["built"], 2)
+        self.assertNotEqual(self.project.assets()["index.css"], assets["index.css"])
+        self.assertFalse(os.path.exists(self.public(assets["index.css"])))
+        # Clean builds don't copy unchanged assets again
+        logo = self.public(self.project.assets()["logo.svg"])
+        os.utime(logo, ns=(1, os.stat(logo).st_mtime_ns))
+        self.assertEqual(self.project.build()["static"]["copied"], 0)
+        self.assertEqual(os.stat(logo).st_atime_ns, 1)
+
+    def test_build_archive_clashing_sources(self):
+        self.write(
+            os.path.join(self.project.content, "index.html"),
+            "<html><head><title>t</title></head><body></body></html>",
+        )
+        tar_path = os.path.join(self.tmp.name, "site.tar.gz")
+        stats = self.project.build_archive(tar_path)
+        self.assertEqual((stats["built"], stats["failed"]), (1, 2))
+        with tarfile.open(tar_path) as archive:
+            self.assertEqual(archive.getnames(), ["index.css", "blog/post.html"])
+
+    def test_build_archive(self):
+        shutil.rmtree(self.project.public)
+        tar_path = os.path.join(self.tmp.name, "site.tar.gz")
+        stats = self.project.build_archive(tar_path)
+        self.assertEqual((stats["built"], stats["static"]["copied"]), (2, 1))
+        self.assertFalse(os.path.exists(self.project.public))
+        with tarfile.open(tar_path) as archive:
+            self.assertEqual(
+                archive.getnames(), ["index.css", "index.html", "blog/post.html"]
+            )
+            page = archive.extractfile("index.html").read().decode("utf-8")
+            self.assertIn("<title>Index</title>", page)
+        with open(tar_path, "rb") as file:
+            first = file.read()
+        # Pages rendered by worker processes land in the same order
+        self.project.jobs = 2
+        self.project.build_archive(tar_path)
+        with open(tar_path, "rb") as file:
+            self.assertEqual(file.read(), first)
+
+        zip_path = os.path.join(self.tmp.name, "site.zip")
+        self.project.build_archive(zip_path)
+        with zipfile.ZipFile(zip_path) as archive:
+            self.assertEqual(
+                archive.namelist(), ["index.css", "index.html", "blog/post.html"]
+            )
+        self.assertFalse(os.path.exists(self.project.public))
+
+
+if __name__ == "__main__":
+    unittest.main()
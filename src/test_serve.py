@@ -0,0 +1,98 @@
+import unittest
+import http.client
+import http.server
+import os
+import logging
+import threading
+from project import Project
+from serve import DevRequestHandler, ReloadSignal, RELOAD_SCRIPT, Watcher
+from fixtures import TempDirTestCase
+
+
+class TestDevServer(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("index.html", "<html><body><p>hi</p></body></html>")
+        self.write("index.css", "p {}")
+        directory = self.tmp.name
+
+        class Handler(DevRequestHandler):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, directory=directory, **kwargs)
+
+        Handler.reload_signal = ReloadSignal()
+        self.server = http.server.ThreadingHTTPServer(("localhost", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def get(self, path):
+        connection = http.client.HTTPConnection("localhost", self.server.server_port)
+        connection.request("GET", path)
+        body = connection.getresponse().read()
+        connection.close()
+        return body
+
+    def test_reload_script_injected_into_pages(self):
+        expected = b"<html><body><p>hi</p>" + RELOAD_SCRIPT + b"</body></html>"
+        self.assertEqual(self.get("/"), expected)
+        self.assertEqual(self.get("/index.html"), expected)
+        with open(os.path.join(self.tmp.name, "index.html"), "rb") as file:
+            self.assertNotIn(RELOAD_SCRIPT, file.read())
+
+    def test_other_files_served_untouched(self):
+        self.assertEqual(self.get("/index.css"), b"p {}")
+
+
+class TestReloadSignal(unittest.TestCase):
+    def test_wait(self):
+        signal = ReloadSignal()
+        self.assertEqual(signal.wait(0, 0.01), 0)
+        signal.notify()
+        self.assertEqual(signal.wait(0, 0.01), 1)
+
+
+class TestWatcher(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.project = Project(self.tmp.name, logging.getLogger(__name__))
+        os.makedirs(os.path.join(self.project.content, "blog"))
+        self.write(self.project.template_path, "{{ Title }}{{ Content }}")
+        self.write(os.path.join(self.project.content, "blog", "post.md"), "# Post")
+
+    def check_changes(self, notify):
+        watcher = Watcher(self.project, interval=0.05, notify=notify)
+        self.addCleanup(watcher.close)
+        content = self.project.content
+        self.assertEqual(watcher.changes(), [])
+        post = os.path.join(content, "blog", "post.md")
+        self.write(post, "# Edited post")
+        self.assertEqual(watcher.changes(), [post])
+        # A new directory, its files written before it could be watched
+        os.makedirs(os.path.join(content, "new", "deeper"))
+        page = os.path.join(content, "new", "deeper", "page.md")
+        self.write(page, "# Page")
+        self.assertEqual(watcher.changes(), [page])
+        os.rename(os.path.join(content, "new"), os.path.join(self.tmp.name, "moved"))
+        self.assertEqual(watcher.changes(), [page])
+        self.write(self.project.template_path, "{{ Content }}")
+        self.assertEqual(watcher.changes(), [self.project.template_path])
+        # Other files next to the template are ignored
+        self.write(os.path.join(self.tmp.name, "notes.txt"), "")
+        self.assertEqual(watcher.changes(), [])
+        return watcher
+
+    def test_polling(self):
+        watcher = self.check_changes(notify=False)
+        self.assertIsNone(watcher.notifier)
+
+    @unittest.skipUnless(os.path.isdir("/proc/sys/fs/inotify"), "needs inotify")
+    def test_inotify(self):
+        watcher = self.check_changes(notify=True)
+        self.assertIsNotNone(watcher.notifier)
+
+
+if __name__ == "__main__":
+    unittest.main()
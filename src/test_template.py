@@ -0,0 +1,98 @@
+import unittest
+import os
+from template import compile_template, load_template
+from fixtures import TempDirTestCase
+
+
+class TestCompileTemplate(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = self.tmp.name
+        os.mkdir(os.path.join(self.root, "partials"))
+        self.write("partials/nav.html", "<nav>{{ Title }}</nav>")
+        self.write("partials/head.html", "<title>{{ Title }}</title>{{> nav }}")
+        self.write(
+            "template.html",
+            "<html>{{> partials/head }}<main>{{ Content }}</main>"
+            "<footer>{{Year}}</footer></html>\n",
+        )
+
+    def test_render(self):
+        template = compile_template(os.path.join(self.root, "template.html"))
+        self.assertEqual(
+            template.render({"Title": "Hi", "Content": "<p>x</p>", "Year": "2024"}),
+            "<html><title>Hi</title><nav>Hi</nav><main><p>x</p></main>"
+            "<footer>2024</footer></html>\n",
+        )
+
+    def test_partials_resolved_at_compile_time(self):
+        template = compile_template(os.path.join(self.root, "template.html"))
+        self.assertEqual(template.names, {"Title", "Content", "Year"})
+        self.assertEqual(len(template.sources), 3)
+        self.assertEqual(len(template.parts), 2 * len(template.slots) + 1)
+
+    def test_indents_and_minified(self):
+        self.write(
+            "template.html",
+            "<html>\n  <body>\n    <main>{{ Content }}</main>\n  </body>\n</html>\n",
+        )
+        template = compile_template(os.path.join(self.root, "template.html"))
+        self.assertEqual(template.indents["Content"], "    ")
+        self.assertEqual(
+            template.minified().render({"Content": "<p>x</p>"}),
+            "<html><body><main><p>x</p></main></body></html>",
+        )
+
+    def test_render_into_streams_callable_values(self):
+        template = compile_template(os.path.join(self.root, "template.html"))
+        chunks = []
+        template.render_into(
+            chunks.append,
+            {"Title": "Hi", "Content": lambda write: write("<p>x</p>"), "Year": "1"},
+        )
+        self.assertIn("<p>x</p>", chunks)
+        self.assertEqual(
+            "".join(chunks),
+            template.render({"Title": "Hi", "Content": "<p>x</p>", "Year": "1"}),
+        )
+
+    def test_placeholders_without_value_kept(self):
+        self.write(
+            "template.html",
+            "<title>{{ Title }}</title>{{Year}}<script>{{ message }}</script>",
+        )
+        template = compile_template(os.path.join(self.root, "template.html"))
+        self.assertEqual(
+            template.render({"Title": "Hi"}),
+            "<title>Hi</title>{{Year}}<script>{{ message }}</script>",
+        )
+        self.assertEqual(
+            template.minified().render({"Title": "Hi", "Year": "2024"}),
+            "<title>Hi</title>2024<script>{{ message }}</script>",
+        )
+
+    def test_recursive_partial(self):
+        self.write("partials/nav.html", "{{> head }}")
+        self.assertRaises(
+            ValueError, compile_template, os.path.join(self.root, "template.html")
+        )
+
+    def test_missing_partial(self):
+        self.write("template.html", "{{> nowhere }}")
+        self.assertRaises(
+            ValueError, compile_template, os.path.join(self.root, "template.html")
+        )
+
+    def test_load_template_recompiles_on_partial_change(self):
+        path = os.path.join(self.root, "template.html")
+        first = load_template(path)
+        self.assertIs(load_template(path), first)
+        self.write("partials/nav.html", "<nav>changed</nav>")
+        os.utime(os.path.join(self.root, "partials", "nav.html"), ns=(1, 1))
+        second = load_template(path)
+        self.assertIsNot(second, first)
+        self.assertNotEqual(second.digest, first.digest)
+
+
+if __name__ == "__main__":
+    unittest.main()
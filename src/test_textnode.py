@@ -28,5 +28,10 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("this is a text node", TextType.BOLD)
         self.assertNotEqual(node, node2)
 
+    def test_text_type_is_enum(self):
+        node = TextNode("this is a text node", TextType.CODE)
+        self.assertIs(node.text_type, TextType.CODE)
+        self.assertFalse(hasattr(node, "__dict__"))
+
 if __name__ == "__main__":
     unittest.main()
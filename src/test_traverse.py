@@ -0,0 +1,61 @@
+import unittest
+import os
+import sys
+from functions import plan_pages
+from traverse import scan_files, scan_tree
+from fixtures import TempDirTestCase
+
+
+class TestScanTree(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = self.tmp.name
+        for rel_path in ("b.md", "a/z.md", "a/c/d.md", "a.md", "a/b/e.md"):
+            path = os.path.join(self.root, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as file:
+                file.write(rel_path)
+
+    def test_order(self):
+        self.assertEqual(
+            [rel_path for rel_path, _ in scan_tree(self.root)],
+            ["a.md", "b.md", "a/z.md", "a/b/e.md", "a/c/d.md"],
+        )
+
+    def test_stat(self):
+        sizes = dict(
+            (rel_path, stat.st_size) for rel_path, stat in scan_files(self.root)
+        )
+        self.assertEqual(sizes["a/c/d.md"], len("a/c/d.md"))
+
+    def test_deep_nesting(self):
+        rel_dir = os.path.join(*["d"] * 300)
+        os.makedirs(os.path.join(self.root, rel_dir))
+        with open(os.path.join(self.root, rel_dir, "deep.md"), "w") as file:
+            file.write("deep")
+        # Nesting deeper than the recursion limit must still be walked
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(150)
+        try:
+            rel_paths = [rel_path for rel_path, _ in scan_tree(self.root)]
+        finally:
+            sys.setrecursionlimit(limit)
+        self.assertEqual(rel_paths[-1], os.path.join(rel_dir, "deep.md"))
+
+    def test_symlink_loop(self):
+        os.symlink(self.root, os.path.join(self.root, "a", "loop"))
+        os.symlink(os.path.join(self.root, "a", "b"), os.path.join(self.root, "f"))
+        os.symlink(os.path.join(self.root, "a"), os.path.join(self.root, "g"))
+        rel_paths = [rel_path for rel_path, _ in scan_tree(self.root)]
+        self.assertEqual(rel_paths, ["a.md", "b.md", "a/z.md", "a/b/e.md", "a/c/d.md"])
+
+    def test_plan_pages(self):
+        plan = plan_pages(self.root, "public")
+        self.assertEqual(
+            plan[3], (os.path.join(self.root, "a/b/e.md"), "public/a/b/e.html")
+        )
+        self.assertEqual(plan_pages(os.path.join(self.root, "missing"), "public"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,12 +12,16 @@ class TextType(Enum):
 
 
 class TextNode:
-    def __init__(self, text, text_type, url=None):
+    __slots__ = ("text", "text_type", "url")
+
+    def __init__(self, text, text_type: TextType, url=None):
         self.text = text
-        self.text_type = text_type.value
+        self.text_type = text_type
         self.url = url
 
     def __eq__(self, other):
+        if not isinstance(other, TextNode):
+            return NotImplemented
         if (
             self.text == other.text
             and self.text_type == other.text_type
@@ -28,4 +32,4 @@ class TextNode:
             return False
 
     def __repr__(self):
-        return f"TextNode({self.text}, {self.text_type}, {self.url})"
+        return f"TextNode({self.text}, {self.text_type.value}, {self.url})"
@@ -0,0 +1,44 @@
+import os
+from typing import Iterator, Tuple
+
+
+def scan_tree(root: str) -> Iterator[Tuple[str, os.DirEntry]]:
+    """Yield (relative path, DirEntry) for every file under root.
+
+    Directories are walked from an explicit stack instead of by recursion,
+    so depth costs nothing, and each directory is closed before its files
+    are yielded. Within a directory files come in name order, followed by
+    its subdirectories in name order, so every run and filesystem gives the
+    same order. File types come from the DirEntry, so walking makes no stat
+    calls of its own, and entry.stat() is cached for callers that need it.
+    Symlinked directories are followed. Each real directory is walked at
+    most once, under the first path the walk reaches it by, so links to
+    directories elsewhere in the tree don't produce duplicate files.
+    """
+    stack = [("", os.path.realpath(root))]
+    seen = set()
+    while stack:
+        rel_dir, real_dir = stack.pop()
+        if real_dir in seen:
+            continue
+        seen.add(real_dir)
+        with os.scandir(os.path.join(root, rel_dir)) as entries:
+            entries = sorted(entries, key=lambda entry: entry.name)
+        subdirs = []
+        for entry in entries:
+            rel_path = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+            if entry.is_dir():
+                if entry.is_symlink():
+                    real_path = os.path.realpath(entry.path)
+                else:
+                    real_path = os.path.join(real_dir, entry.name)
+                subdirs.append((rel_path, real_path))
+            elif entry.is_file():
+                yield rel_path, entry
+        stack.extend(reversed(subdirs))
+
+
+def scan_files(root: str) -> Iterator[Tuple[str, os.stat_result]]:
+    """Yield (relative path, stat) for every file under root, see scan_tree."""
+    for rel_path, entry in scan_tree(root):
+        yield rel_path, entry.stat()